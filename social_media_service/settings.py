@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 import os
 from datetime import timedelta
 from pathlib import Path
+
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -46,6 +48,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "rest_framework_simplejwt",
     "rest_framework_simplejwt.token_blacklist",
@@ -136,6 +139,20 @@ USE_I18N = True
 USE_TZ = True
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+REDIS_URL = os.environ.get("REDIS_URL")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.0/howto/static-files/
 
@@ -144,6 +161,33 @@ STATIC_URL = "static/"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# How media files reach clients: "django" streams them through Django's
+# static view (development only, needs DEBUG), "accel" hands them over to
+# nginx with X-Accel-Redirect and "sendfile" to Apache or lighttpd with
+# X-Sendfile.
+MEDIA_SERVING = os.environ.get("MEDIA_SERVING", "django")
+if MEDIA_SERVING not in ("django", "accel", "sendfile"):
+    raise ImproperlyConfigured(
+        f"MEDIA_SERVING must be django, accel or sendfile, "
+        f"not {MEDIA_SERVING!r}."
+    )
+# Internal nginx location aliasing MEDIA_ROOT, for MEDIA_SERVING "accel".
+MEDIA_ACCEL_REDIRECT_PREFIX = os.environ.get(
+    "MEDIA_ACCEL_REDIRECT_PREFIX", "/protected-media/"
+)
+# Seconds clients may cache media files that are not content addressed.
+MEDIA_CACHE_MAX_AGE = int(os.environ.get("MEDIA_CACHE_MAX_AGE", 24 * 60 * 60))
+
+# Uploads are stored once per distinct content, named after its digest.
+STORAGES = {
+    "default": {
+        "BACKEND": "social_network.media.ContentAddressedStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -151,14 +195,24 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
     "DEFAULT_THROTTLE_CLASSES": [
-        "rest_framework.throttling.AnonRateThrottle",
-        "rest_framework.throttling.UserRateThrottle",
+        "social_network.throttling.AnonRateThrottle",
+        "social_network.throttling.UserRateThrottle",
+        "social_network.throttling.ScopedRateThrottle",
     ],
-    "DEFAULT_THROTTLE_RATES": {"anon": "100/day", "user": "300/day"},
+    "DEFAULT_THROTTLE_RATES": {
+        "anon": "100/day",
+        "user": "300/day",
+        "login": "5/min",
+        "post_create": "10/min",
+        "like": "60/min",
+        "follow": "30/min",
+    },
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "social_network.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_PAGINATION_CLASS": "social_network.pagination.KeysetPagination",
+    "PAGE_SIZE": 20,
 }
 
 SPECTACULAR_SETTINGS = {
@@ -179,10 +233,129 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
     "ROTATE_REFRESH_TOKENS": False,
     "BLACKLIST_AFTER_ROTATION": True,
+    "CHECK_REVOKE_TOKEN": True,
 }
 
+# Seconds an authenticated user is served from the cache without a query.
+AUTH_USER_CACHE_TIMEOUT = int(os.environ.get("AUTH_USER_CACHE_TIMEOUT", 60))
+
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL")
 CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND")
 CELERY_TIMEZONE = "Europe/Kyiv"
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60
+# Seconds the Redis broker waits for a task to be acknowledged before it
+# delivers it again. Tasks waiting for an ETA stay unacknowledged, so none
+# are scheduled further ahead than this.
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    "visibility_timeout": int(
+        os.environ.get("CELERY_VISIBILITY_TIMEOUT", 60 * 60)
+    ),
+}
+# Due scheduled posts are swept up this often; posts coming due before the
+# next sweep get their publishing task scheduled by it.
+PUBLISH_POSTS_INTERVAL = timedelta(minutes=15)
+CELERY_BEAT_SCHEDULE = {
+    "compute-follow-suggestions": {
+        "task": "social_network.tasks.compute_follow_suggestions",
+        "schedule": timedelta(minutes=30),
+    },
+    "publish-missed-posts": {
+        "task": "social_network.tasks.publish_posts",
+        "schedule": PUBLISH_POSTS_INTERVAL,
+    },
+    "prune-hashtag-activity": {
+        "task": "social_network.tasks.prune_hashtag_activity",
+        "schedule": timedelta(hours=1),
+    },
+    "collect-media-garbage": {
+        "task": "social_network.tasks.collect_media_garbage",
+        "schedule": timedelta(hours=1),
+    },
+}
+
+# Number of most recent posts kept in every user's materialized timeline.
+TIMELINE_DEPTH = int(os.environ.get("TIMELINE_DEPTH", 800))
+TIMELINE_FAN_OUT_BATCH_SIZE = int(
+    os.environ.get("TIMELINE_FAN_OUT_BATCH_SIZE", 1000)
+)
+# Authors with more followers than this are not fanned out on write: their
+# recent posts are merged into followers' feeds at read time instead.
+FEED_FAN_OUT_FOLLOWER_LIMIT = int(
+    os.environ.get("FEED_FAN_OUT_FOLLOWER_LIMIT", 10000)
+)
+FEED_RECENT_POSTS_SIZE = int(os.environ.get("FEED_RECENT_POSTS_SIZE", 50))
+
+# Seconds the cached followee/follower id arrays of a user are kept.
+FOLLOW_GRAPH_CACHE_TIMEOUT = int(
+    os.environ.get("FOLLOW_GRAPH_CACHE_TIMEOUT", 60 * 60)
+)
+
+# Number of "people you may know" suggestions stored per user and the
+# number of users ranked per query by the suggestions job.
+FOLLOW_SUGGESTIONS_SIZE = int(os.environ.get("FOLLOW_SUGGESTIONS_SIZE", 20))
+FOLLOW_SUGGESTIONS_BATCH_SIZE = int(
+    os.environ.get("FOLLOW_SUGGESTIONS_BATCH_SIZE", 500)
+)
+
+# Trending hashtags are ranked by uses summed over per-bucket counters of
+# the last TRENDING_HASHTAGS_WINDOW; older buckets are pruned periodically.
+TRENDING_HASHTAGS_BUCKET = timedelta(
+    seconds=int(os.environ.get("TRENDING_HASHTAGS_BUCKET_SECONDS", 5 * 60))
+)
+TRENDING_HASHTAGS_WINDOW = timedelta(
+    seconds=int(
+        os.environ.get("TRENDING_HASHTAGS_WINDOW_SECONDS", 24 * 60 * 60)
+    )
+)
+TRENDING_HASHTAGS_SIZE = int(os.environ.get("TRENDING_HASHTAGS_SIZE", 10))
+TRENDING_HASHTAGS_CACHE_TIMEOUT = int(
+    os.environ.get("TRENDING_HASHTAGS_CACHE_TIMEOUT", 60)
+)
+
+# Text search configuration used to build and query the post search vector;
+# changing it requires a migration rebuilding the vectors.
+POST_SEARCH_CONFIG = "english"
+
+# Autocomplete suggests the most used hashtags for a prefix and caches
+# every prefix's suggestions briefly.
+HASHTAG_AUTOCOMPLETE_SIZE = int(
+    os.environ.get("HASHTAG_AUTOCOMPLETE_SIZE", 10)
+)
+HASHTAG_AUTOCOMPLETE_CACHE_TIMEOUT = int(
+    os.environ.get("HASHTAG_AUTOCOMPLETE_CACHE_TIMEOUT", 60)
+)
+
+# Due scheduled posts are published in chunks of this many rows per UPDATE.
+PUBLISH_POSTS_BATCH_SIZE = int(os.environ.get("PUBLISH_POSTS_BATCH_SIZE", 500))
+
+# Seconds a serialized post detail is kept; writes to the post, its likes
+# and comments invalidate it earlier.
+POST_DETAIL_CACHE_TIMEOUT = int(
+    os.environ.get("POST_DETAIL_CACHE_TIMEOUT", 5 * 60)
+)
+
+# Bounding boxes in pixels of the variants rendered from uploaded images and
+# the quality of their WebP and JPEG encodings.
+IMAGE_VARIANTS = {"thumb": 160, "feed": 720, "full": 1600}
+IMAGE_VARIANT_QUALITY = int(os.environ.get("IMAGE_VARIANT_QUALITY", 80))
+
+# Uploaded images are refused beyond these sizes, checked while the upload
+# streams in and before any pixel data is decoded.
+IMAGE_UPLOAD_MAX_BYTES = int(
+    os.environ.get("IMAGE_UPLOAD_MAX_BYTES", 10 * 1024 * 1024)
+)
+IMAGE_UPLOAD_MAX_MEGAPIXELS = int(
+    os.environ.get("IMAGE_UPLOAD_MAX_MEGAPIXELS", 40)
+)
+IMAGE_UPLOAD_FORMATS = ("JPEG", "PNG", "GIF", "WEBP")
+
+# Media blobs nobody refers to are deleted once they were not touched for
+# this long, in batches of MEDIA_GC_BATCH_SIZE.
+MEDIA_GC_GRACE_PERIOD = timedelta(
+    seconds=int(os.environ.get("MEDIA_GC_GRACE_PERIOD_SECONDS", 60 * 60))
+)
+MEDIA_GC_BATCH_SIZE = int(os.environ.get("MEDIA_GC_BATCH_SIZE", 500))
+
+# Most images a post's gallery holds.
+POST_IMAGES_MAX = int(os.environ.get("POST_IMAGES_MAX", 10))
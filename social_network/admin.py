@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as DjangoUserAdmin
 from django.utils.translation import gettext as _
 
+from social_network.authentication import invalidate_user
 from social_network.models import User, Post, Comment, Hashtag
 
 
@@ -27,12 +28,35 @@ class UserAdmin(DjangoUserAdmin):
     search_fields = ("email", "first_name", "last_name")
     ordering = ("email",)
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        invalidate_user(obj.id)
+
+    def delete_model(self, request, obj):
+        invalidate_user(obj.id)
+        super().delete_model(request, obj)
+
+    def user_change_password(self, request, id, form_url=""):
+        # The password form saves the user without going through save_model.
+        response = super().user_change_password(request, id, form_url)
+        if request.method == "POST":
+            invalidate_user(id)
+        return response
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return queryset.search(search_term), False
+
 
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
     list_display = ("title", "author", "created_at")
     search_fields = ("title",)
     list_filter = ("author",)
+    # Images are only replaced through the API, which keeps their stored
+    # files referenced and renders the variants.
+    exclude = ("image", "image_variants")
 
 
 @admin.register(Comment)
@@ -0,0 +1,87 @@
+"""JWT authentication without a User query on every request.
+
+`CachedJWTAuthentication` keeps the user of a token in the default cache
+for a short time. Tokens carry a hash of the password they were issued
+for, which is checked against the cached user, so changing the password
+revokes them as soon as the cached entry is dropped; the write paths that
+change a user call `invalidate_user`, and the timeout bounds staleness
+for any other change.
+
+`StatelessJWTAuthentication` trusts the token claims alone, for read-only
+endpoints that need nothing but the user id.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework_simplejwt.authentication import (
+    JWTAuthentication,
+    JWTStatelessUserAuthentication,
+)
+from rest_framework_simplejwt.exceptions import (
+    AuthenticationFailed,
+    InvalidToken,
+)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+def user_key(user_id) -> str:
+    return f"auth-user:{user_id}"
+
+
+def invalidate_user(user_id) -> None:
+    """Drop the cached user now and again once the change is committed."""
+    key = user_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            )
+
+        user = cache.get(user_key(user_id))
+        if user is None:
+            user = super().get_user(validated_token)
+            cache.set(
+                user_key(user_id), user, settings.AUTH_USER_CACHE_TIMEOUT
+            )
+            return user
+
+        if not user.is_active:
+            raise AuthenticationFailed(
+                _("User is inactive"), code="user_inactive"
+            )
+
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."),
+                code="password_changed",
+            )
+
+        return user
+
+
+class StatelessJWTAuthentication(JWTStatelessUserAuthentication):
+    """Authenticate with a `TokenUser` built from the token claims.
+
+    No lookup happens at all, so a deactivated user keeps access until the
+    token expires; only use it where that is acceptable.
+    """
+
+
+class CachedJWTScheme(SimpleJWTScheme):
+    target_class = CachedJWTAuthentication
+
+
+class StatelessJWTScheme(SimpleJWTScheme):
+    target_class = StatelessJWTAuthentication
@@ -0,0 +1,79 @@
+"""Recomputation of the denormalized counter columns.
+
+The counters are kept up to date with F() expressions on the write paths;
+the helpers here recompute them from the underlying tables to repair any
+drift. They only take model classes as arguments, so migrations can use
+them with historical models.
+"""
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_of(queryset, field: str):
+    """Number of rows in `queryset` whose `field` points at the outer row."""
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(total=Count("*"))
+            .values("total")
+        ),
+        0,
+    )
+
+
+def get_counters(user_model, post_model, comment_model) -> dict:
+    """Map every model to its counter columns and their true values."""
+    follow_model = user_model.followings.through
+    hashtag_model = post_model.hashtags.field.related_model
+
+    return {
+        user_model: {
+            "follower_count": count_of(follow_model.objects, "followee_id"),
+            "following_count": count_of(follow_model.objects, "follower_id"),
+            "post_count": count_of(post_model.objects, "author_id"),
+        },
+        post_model: {
+            "like_count": count_of(
+                post_model.likes.through.objects, "post_id"
+            ),
+            "comment_count": count_of(comment_model.objects, "post_id"),
+        },
+        hashtag_model: {
+            "post_count": count_of(
+                post_model.hashtags.through.objects, "hashtag_id"
+            ),
+        },
+    }
+
+
+def recount(model, counters: dict, pks) -> int:
+    """Recompute the counters of the rows with the given primary keys."""
+    return model._default_manager.filter(pk__in=pks).update(**counters)
+
+
+def reconcile(model, counters: dict, batch_size: int) -> int:
+    """Rewrite drifted counters of `model` in primary key batches.
+
+    Returns the number of rows that had to be fixed.
+    """
+    drifted = Q()
+    for field, expression in counters.items():
+        drifted |= ~Q(**{field: expression})
+
+    fixed = 0
+    last_pk = 0
+    while True:
+        batch = list(
+            model._default_manager.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not batch:
+            return fixed
+
+        last_pk = batch[-1]
+        fixed += model._default_manager.filter(
+            drifted, pk__in=batch
+        ).update(**counters)
@@ -0,0 +1,70 @@
+"""Cached adjacency lists of the follow graph.
+
+Every user's followees and followers are kept in the default cache as
+compact sorted arrays of ids, loaded from the Follow indexes on a miss and
+dropped whenever follow-unfollow changes an edge. Membership checks are a
+binary search over the array.
+"""
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from social_network.models import Follow
+
+
+def followees_key(user_id: int) -> str:
+    return f"follow-graph:followees:{user_id}"
+
+
+def followers_key(user_id: int) -> str:
+    return f"follow-graph:followers:{user_id}"
+
+
+def _get_ids(key: str, queryset) -> array:
+    cached = cache.get(key)
+    if cached is not None:
+        return array("q", cached)
+
+    ids = array("q", queryset)
+    cache.set(key, ids.tobytes(), settings.FOLLOW_GRAPH_CACHE_TIMEOUT)
+    return ids
+
+
+def followee_ids(user_id: int) -> array:
+    """Sorted ids of the users the given user follows."""
+    return _get_ids(
+        followees_key(user_id),
+        Follow.objects.filter(follower_id=user_id)
+        .order_by("followee_id")
+        .values_list("followee_id", flat=True),
+    )
+
+
+def follower_ids(user_id: int) -> array:
+    """Sorted ids of the users following the given user."""
+    return _get_ids(
+        followers_key(user_id),
+        Follow.objects.filter(followee_id=user_id)
+        .order_by("follower_id")
+        .values_list("follower_id", flat=True),
+    )
+
+
+def is_following(follower_id: int, followee_id: int) -> bool:
+    ids = followee_ids(follower_id)
+    position = bisect_left(ids, followee_id)
+    return position < len(ids) and ids[position] == followee_id
+
+
+def invalidate(follower_id: int, followee_id: int) -> None:
+    """Forget both adjacency lists touched by a changed edge.
+
+    The entries are dropped again on commit, so a concurrent read cannot
+    keep a copy loaded before the change became visible.
+    """
+    keys = [followees_key(follower_id), followers_key(followee_id)]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,120 @@
+"""Resized variants of uploaded user and post images.
+
+Uploads are stored as they come and a Celery task renders the variants
+afterwards. The original is decoded once, at a reduced scale where the
+format allows it, turned upright according to its EXIF orientation and
+then shrunk step by step to the bounding box of every variant, each saved
+as WebP and JPEG. Variants are written without metadata, so EXIF (GPS
+position included) never reaches the clients.
+"""
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from social_network import media
+
+VARIANT_FORMATS = {"webp": "WEBP", "jpeg": "JPEG"}
+
+
+def variant_name(name: str, variant: str, extension: str) -> str:
+    """Storage name of a variant, next to its original."""
+    directory, filename = os.path.split(name)
+    stem, _ = os.path.splitext(filename)
+    filename = f"{stem}-{variant}.{extension}"
+
+    return os.path.join(directory, "variants", filename)
+
+
+def flatten(image):
+    """The image on a white background, for formats without alpha."""
+    if image.mode != "RGBA":
+        return image
+
+    background = Image.new("RGB", image.size, "white")
+    background.paste(image, mask=image.getchannel("A"))
+    return background
+
+
+def render_variants(image_file) -> dict:
+    """Save the variants of the image file next to it.
+
+    Returns a map of variant name to its width, height and the storage
+    names of its WebP and JPEG files.
+    """
+    sizes = sorted(
+        settings.IMAGE_VARIANTS.items(), key=lambda item: item[1], reverse=True
+    )
+
+    with image_file.open("rb"), Image.open(image_file) as original:
+        original.draft("RGB", (sizes[0][1], sizes[0][1]))
+        image = ImageOps.exif_transpose(original)
+        icc_profile = original.info.get("icc_profile")
+
+    image = image.convert("RGBA" if image.has_transparency_data else "RGB")
+
+    variants = {}
+    for variant, size in sizes:
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+        variants[variant] = {"width": image.width, "height": image.height}
+
+        for extension, image_format in VARIANT_FORMATS.items():
+            buffer = BytesIO()
+            rendition = flatten(image) if image_format == "JPEG" else image
+            rendition.save(
+                buffer,
+                image_format,
+                quality=settings.IMAGE_VARIANT_QUALITY,
+                icc_profile=icc_profile,
+            )
+            variants[variant][extension] = image_file.storage.save(
+                variant_name(image_file.name, variant, extension),
+                ContentFile(buffer.getvalue()),
+            )
+
+    return variants
+
+
+def variant_names(variants: dict) -> list:
+    """Storage names of all files of the variants."""
+    return [
+        rendition[extension]
+        for rendition in variants.values()
+        for extension in VARIANT_FORMATS
+    ]
+
+
+def file_names(instance) -> list:
+    """Storage names of the image of a user or post and its variants."""
+    names = variant_names(instance.image_variants)
+    if instance.image:
+        names.append(instance.image.name)
+
+    return names
+
+
+def process_image(instance) -> dict:
+    """Render the variants of the instance's image and record them.
+
+    Nothing is recorded if the image was replaced in the meantime; the
+    upload of the new one has its own task.
+    """
+    variants = render_variants(instance.image)
+
+    with transaction.atomic():
+        current = (
+            type(instance).objects.select_for_update()
+            .filter(pk=instance.pk, image=instance.image.name)
+            .only("image_variants")
+            .first()
+        )
+        if current is not None:
+            media.release(variant_names(current.image_variants))
+            current.image_variants = variants
+            current.save(update_fields=["image_variants"])
+            media.retain(variant_names(variants))
+
+    return variants
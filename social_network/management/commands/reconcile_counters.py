@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from social_network.counters import get_counters, reconcile
+from social_network.models import User, Post, Comment
+
+
+class Command(BaseCommand):
+    """Django command to repair drift of the denormalized counters"""
+
+    help = "Recompute post, hashtag and user counters in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of rows recomputed per UPDATE statement.",
+        )
+
+    def handle(self, *args, **options):
+        counters = get_counters(User, Post, Comment)
+        for model, model_counters in counters.items():
+            fixed = reconcile(model, model_counters, options["batch_size"])
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{model._meta.verbose_name}: {fixed} rows reconciled"
+                )
+            )
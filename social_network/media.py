@@ -0,0 +1,175 @@
+"""Content-addressed media storage with reference counting.
+
+`ContentAddressedStorage` names every file after the SHA-256 digest of its
+content, so a file uploaded any number of times is stored once and its URL
+never changes meaning. Every stored file has a `MediaBlob` row counting
+the image fields and variants that refer to it: write paths `retain` the
+names they start referring to and `release` the ones they drop, and a
+periodic task deletes blobs that stayed unreferenced for a grace period.
+
+Saving a file touches its blob before the file is written or reused, and
+the collector deletes files while holding the locks of their rows, so an
+upload reusing a blob either waits for the collector and writes the file
+anew or keeps the blob out of the next collection.
+
+In production `serve` answers media requests with headers only and lets
+the front server send the bytes (MEDIA_SERVING). With nginx that takes an
+internal location aliasing MEDIA_ROOT, e.g.
+
+    location /protected-media/ {
+        internal;
+        alias /vol/web/media/;
+    }
+"""
+import mimetypes
+import os
+import stat
+from collections import Counter
+from hashlib import sha256
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import transaction
+from django.db.models import F
+from django.http import Http404, HttpResponse
+from django.utils import timezone
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+from social_network.models import MediaBlob
+
+
+def blob_name(digest: str, extension: str) -> str:
+    return os.path.join("blobs", digest[:2], digest[2:4], digest + extension)
+
+
+def touch(name: str) -> None:
+    """Create the blob of the name or refresh its touch time."""
+    MediaBlob.objects.bulk_create(
+        [MediaBlob(name=name, touched_at=timezone.now())],
+        update_conflicts=True,
+        unique_fields=["name"],
+        update_fields=["touched_at"],
+    )
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage keeping every distinct content once.
+
+    The name passed in only contributes its extension.
+    """
+
+    def _save(self, name, content):
+        digest = sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+
+        _, extension = os.path.splitext(name)
+        name = blob_name(digest.hexdigest(), extension.lower())
+
+        touch(name)
+        if self.exists(name):
+            return name
+
+        saved = super()._save(name, content)
+        if saved != name:
+            # Lost a race writing the same content; keep the copy counted.
+            touch(saved)
+        return saved
+
+
+def _add_references(names, delta: int) -> None:
+    # Sorted so that concurrent updates lock blobs in the same order.
+    for name, count in sorted(Counter(filter(None, names)).items()):
+        MediaBlob.objects.filter(name=name).update(
+            ref_count=F("ref_count") + delta * count,
+            touched_at=timezone.now(),
+        )
+
+
+def retain(names) -> None:
+    """Count a new reference to each of the stored files."""
+    _add_references(names, 1)
+
+
+def release(names) -> None:
+    """Drop a reference to each of the stored files.
+
+    Files stored before content addressing have no blob and are kept.
+    """
+    _add_references(names, -1)
+
+
+def collect_garbage(batch_size: int) -> int:
+    """Delete up to `batch_size` blobs unreferenced for the grace period.
+
+    Returns how many blobs were deleted.
+    """
+    cutoff = timezone.now() - settings.MEDIA_GC_GRACE_PERIOD
+
+    with transaction.atomic():
+        blobs = list(
+            MediaBlob.objects.filter(ref_count__lte=0, touched_at__lt=cutoff)
+            .order_by("touched_at")
+            .select_for_update(skip_locked=True)
+            .values_list("id", "name")[:batch_size]
+        )
+        MediaBlob.objects.filter(
+            id__in=[blob_id for blob_id, _ in blobs]
+        ).delete()
+        for _, name in blobs:
+            default_storage.delete(name)
+
+    return len(blobs)
+
+
+@require_safe
+def serve(request, path):
+    """Hand a media file over to the front server.
+
+    Content-addressed blobs never change, so they may be cached forever;
+    other files for MEDIA_CACHE_MAX_AGE. The ETag is built like nginx
+    builds it from the file, so conditional requests get the same answer
+    from either.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        file_stat = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404
+    if not stat.S_ISREG(file_stat.st_mode):
+        raise Http404
+
+    modified = int(file_stat.st_mtime)
+    etag = f'"{modified:x}-{file_stat.st_size:x}"'
+    response = get_conditional_response(
+        request, etag=etag, last_modified=modified
+    )
+    if response is None:
+        content_type, _ = mimetypes.guess_type(full_path)
+        response = HttpResponse(
+            content_type=content_type or "application/octet-stream"
+        )
+        if settings.MEDIA_SERVING == "accel":
+            response["X-Accel-Redirect"] = (
+                settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(path)
+            )
+        else:
+            response["X-Sendfile"] = full_path
+
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(modified)
+    if path.startswith("blobs/"):
+        patch_cache_control(
+            response, public=True, max_age=365 * 24 * 60 * 60, immutable=True
+        )
+    else:
+        patch_cache_control(
+            response, public=True, max_age=settings.MEDIA_CACHE_MAX_AGE
+        )
+    return response
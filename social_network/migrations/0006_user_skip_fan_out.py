@@ -0,0 +1,17 @@
+# Generated by Django 5.0.6 on 2026-10-17 04:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("social_network", "0005_timelineentry_user_timeline_built_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="skip_fan_out",
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.0.6 on 2026-10-17 04:42
+
+from django.db import migrations, models
+
+from social_network.counters import count_of
+
+
+def populate_counters(apps, schema_editor):
+    User = apps.get_model("social_network", "User")
+    Post = apps.get_model("social_network", "Post")
+    Comment = apps.get_model("social_network", "Comment")
+
+    User.objects.update(
+        follower_count=count_of(User.followers.through.objects, "from_user_id"),
+        following_count=count_of(User.followings.through.objects, "from_user_id"),
+        post_count=count_of(Post.objects, "author_id"),
+    )
+    Post.objects.update(
+        like_count=count_of(Post.likes.through.objects, "post_id"),
+        comment_count=count_of(Comment.objects, "post_id"),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("social_network", "0007_keyset_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="comment_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="like_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="follower_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="following_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="post_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
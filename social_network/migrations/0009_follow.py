@@ -0,0 +1,142 @@
+# Generated by Django 5.0.6 on 2026-10-17 04:45
+
+from itertools import islice
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from social_network.counters import count_of
+
+BATCH_SIZE = 1000
+
+
+def copy_follow_edges(apps, schema_editor):
+    """Merge the mirrored followers/followings tables into Follow edges
+    and recount the follow counters from them.
+    """
+    User = apps.get_model("social_network", "User")
+    Follow = apps.get_model("social_network", "Follow")
+
+    edge_sources = (
+        User.followings.through.objects.values_list(
+            "from_user_id", "to_user_id"
+        ),
+        User.followers.through.objects.values_list(
+            "to_user_id", "from_user_id"
+        ),
+    )
+    for edges in edge_sources:
+        edges = edges.iterator(chunk_size=BATCH_SIZE)
+        while batch := list(islice(edges, BATCH_SIZE)):
+            Follow.objects.bulk_create(
+                [
+                    Follow(follower_id=follower_id, followee_id=followee_id)
+                    for follower_id, followee_id in batch
+                ],
+                ignore_conflicts=True,
+            )
+
+    # The counters were taken from one mirrored table each, which may have
+    # missed edges only the other one held.
+    User.objects.update(
+        follower_count=count_of(Follow.objects, "followee_id"),
+        following_count=count_of(Follow.objects, "follower_id"),
+    )
+
+
+def restore_follow_edges(apps, schema_editor):
+    User = apps.get_model("social_network", "User")
+    Follow = apps.get_model("social_network", "Follow")
+    Followings = User.followings.through
+    Followers = User.followers.through
+
+    edges = Follow.objects.values_list(
+        "follower_id", "followee_id"
+    ).iterator(chunk_size=BATCH_SIZE)
+    while batch := list(islice(edges, BATCH_SIZE)):
+        Followings.objects.bulk_create(
+            [
+                Followings(from_user_id=follower_id, to_user_id=followee_id)
+                for follower_id, followee_id in batch
+            ],
+            ignore_conflicts=True,
+        )
+        Followers.objects.bulk_create(
+            [
+                Followers(from_user_id=followee_id, to_user_id=follower_id)
+                for follower_id, followee_id in batch
+            ],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("social_network", "0008_counter_columns"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Follow",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "followee",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="follower_edges",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "follower",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="following_edges",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="follow",
+            index=models.Index(
+                fields=["followee", "follower"], name="follow_followee_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="follow",
+            constraint=models.UniqueConstraint(
+                fields=("follower", "followee"), name="unique_follow"
+            ),
+        ),
+        migrations.RunPython(copy_follow_edges, restore_follow_edges),
+        migrations.RemoveField(
+            model_name="user",
+            name="followers",
+        ),
+        migrations.RemoveField(
+            model_name="user",
+            name="followings",
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="followings",
+            field=models.ManyToManyField(
+                blank=True,
+                related_name="followers",
+                through="social_network.Follow",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.0.6 on 2026-10-17 04:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("social_network", "0010_follow_suggestions"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="HashtagActivity",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("bucket_start", models.DateTimeField()),
+                ("count", models.PositiveIntegerField(default=0)),
+                (
+                    "hashtag",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="activity",
+                        to="social_network.hashtag",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "hashtag activity",
+                "indexes": [
+                    models.Index(
+                        fields=["bucket_start"], name="hashtag_activity_bucket_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="hashtagactivity",
+            constraint=models.UniqueConstraint(
+                fields=("hashtag", "bucket_start"),
+                name="unique_hashtag_activity_bucket",
+            ),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.0.6 on 2026-10-17 04:56
+
+from django.db import migrations
+from django.db.models import F
+
+
+def merge_duplicate_hashtags(apps, schema_editor):
+    """Normalize hashtag names and fold duplicates into the oldest hashtag."""
+    Hashtag = apps.get_model("social_network", "Hashtag")
+    HashtagActivity = apps.get_model("social_network", "HashtagActivity")
+    PostHashtags = apps.get_model("social_network", "Post").hashtags.through
+
+    survivors = {}
+    for hashtag in Hashtag.objects.order_by("id"):
+        name = hashtag.name.strip().lstrip("#").lower()
+        survivor = survivors.setdefault(name, hashtag)
+        if survivor is hashtag:
+            if hashtag.name != name:
+                hashtag.name = name
+                hashtag.save(update_fields=["name"])
+            continue
+
+        PostHashtags.objects.bulk_create(
+            [
+                PostHashtags(post_id=post_id, hashtag_id=survivor.id)
+                for post_id in PostHashtags.objects.filter(
+                    hashtag_id=hashtag.id
+                ).values_list("post_id", flat=True)
+            ],
+            ignore_conflicts=True,
+        )
+        for activity in HashtagActivity.objects.filter(hashtag_id=hashtag.id):
+            merged, created = HashtagActivity.objects.get_or_create(
+                hashtag_id=survivor.id,
+                bucket_start=activity.bucket_start,
+                defaults={"count": activity.count},
+            )
+            if not created:
+                HashtagActivity.objects.filter(id=merged.id).update(
+                    count=F("count") + activity.count
+                )
+        hashtag.delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("social_network", "0011_hashtag_activity"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_hashtags, migrations.RunPython.noop),
+    ]
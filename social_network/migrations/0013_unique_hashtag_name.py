@@ -0,0 +1,17 @@
+# Generated by Django 5.0.6 on 2026-10-17 04:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("social_network", "0012_merge_duplicate_hashtags"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="hashtag",
+            name="name",
+            field=models.CharField(max_length=50, unique=True),
+        ),
+    ]
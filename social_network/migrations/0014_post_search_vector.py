@@ -0,0 +1,105 @@
+# Generated by Django 5.0.6 on 2026-10-17 04:58
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+# The vector of a post is rebuilt by a BEFORE trigger whenever its title or
+# content is written; attaching, detaching or renaming hashtags touches the
+# title of the affected posts to fire it.
+CREATE_TRIGGERS = """
+CREATE FUNCTION social_network_post_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A')
+        || setweight(to_tsvector('english', coalesce((
+            SELECT string_agg(hashtag.name, ' ')
+            FROM social_network_hashtag hashtag
+            JOIN social_network_post_hashtags post_hashtag
+                ON post_hashtag.hashtag_id = hashtag.id
+            WHERE post_hashtag.post_id = NEW.id
+        ), '')), 'A')
+        || setweight(to_tsvector('english', coalesce(NEW.content, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER social_network_post_search_vector
+BEFORE INSERT OR UPDATE OF title, content ON social_network_post
+FOR EACH ROW EXECUTE FUNCTION social_network_post_search_vector();
+
+CREATE FUNCTION social_network_post_hashtags_search_vector()
+RETURNS trigger AS $$
+BEGIN
+    UPDATE social_network_post SET title = title
+    WHERE id IN (SELECT post_id FROM changed_post_hashtags);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER social_network_post_hashtags_insert_search_vector
+AFTER INSERT ON social_network_post_hashtags
+REFERENCING NEW TABLE AS changed_post_hashtags
+FOR EACH STATEMENT
+EXECUTE FUNCTION social_network_post_hashtags_search_vector();
+
+CREATE TRIGGER social_network_post_hashtags_delete_search_vector
+AFTER DELETE ON social_network_post_hashtags
+REFERENCING OLD TABLE AS changed_post_hashtags
+FOR EACH STATEMENT
+EXECUTE FUNCTION social_network_post_hashtags_search_vector();
+
+CREATE FUNCTION social_network_hashtag_search_vector() RETURNS trigger AS $$
+BEGIN
+    UPDATE social_network_post SET title = title
+    WHERE id IN (
+        SELECT post_id FROM social_network_post_hashtags
+        WHERE hashtag_id = NEW.id
+    );
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER social_network_hashtag_search_vector
+AFTER UPDATE OF name ON social_network_hashtag
+FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+EXECUTE FUNCTION social_network_hashtag_search_vector();
+
+UPDATE social_network_post SET title = title;
+"""
+
+DROP_TRIGGERS = """
+DROP TRIGGER social_network_hashtag_search_vector
+    ON social_network_hashtag;
+DROP FUNCTION social_network_hashtag_search_vector();
+DROP TRIGGER social_network_post_hashtags_delete_search_vector
+    ON social_network_post_hashtags;
+DROP TRIGGER social_network_post_hashtags_insert_search_vector
+    ON social_network_post_hashtags;
+DROP FUNCTION social_network_post_hashtags_search_vector();
+DROP TRIGGER social_network_post_search_vector ON social_network_post;
+DROP FUNCTION social_network_post_search_vector();
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("social_network", "0013_unique_hashtag_name"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="post_search_vector_idx"
+            ),
+        ),
+        migrations.RunSQL(CREATE_TRIGGERS, DROP_TRIGGERS),
+    ]
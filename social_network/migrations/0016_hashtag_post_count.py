@@ -0,0 +1,29 @@
+# Generated by Django 5.0.6 on 2026-10-17 05:02
+
+from django.db import migrations, models
+
+from social_network.counters import count_of
+
+
+def populate_post_count(apps, schema_editor):
+    Hashtag = apps.get_model("social_network", "Hashtag")
+    Post = apps.get_model("social_network", "Post")
+
+    Hashtag.objects.update(
+        post_count=count_of(Post.hashtags.through.objects, "hashtag_id")
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("social_network", "0015_user_trigram_search"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="hashtag",
+            name="post_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(populate_post_count, migrations.RunPython.noop),
+    ]
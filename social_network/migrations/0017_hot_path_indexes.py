@@ -0,0 +1,28 @@
+# Generated by Django 5.0.6 on 2026-10-17 05:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("social_network", "0016_hashtag_post_count"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                condition=models.Q(("published", True)),
+                fields=["author", "-created_at", "-id"],
+                name="post_author_published_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                condition=models.Q(("published", False)),
+                fields=["publish_time"],
+                name="post_scheduled_idx",
+            ),
+        ),
+    ]
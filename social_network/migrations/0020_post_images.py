@@ -0,0 +1,58 @@
+# Generated by Django 5.0.6 on 2026-10-17 05:41
+
+import django.db.models.deletion
+import social_network.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("social_network", "0019_media_blobs"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.CreateModel(
+            name="PostImage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "image",
+                    models.ImageField(
+                        upload_to=social_network.models.post_image_file_path
+                    ),
+                ),
+                ("image_variants", models.JSONField(blank=True, default=dict)),
+                ("position", models.PositiveIntegerField()),
+                (
+                    "post",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="images",
+                        to="social_network.post",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["position", "id"],
+                "indexes": [
+                    models.Index(
+                        fields=["post", "position", "id"],
+                        name="post_image_position_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -4,13 +4,51 @@ import uuid
 from django.conf import settings
 from django.contrib.auth.base_user import BaseUserManager
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVectorField,
+    TrigramWordSimilarity,
+)
 from django.db import models
+from django.db.models.functions import Cast, Greatest
 from django.utils.text import slugify
 from django.utils import timezone
 from django.utils.translation import gettext as _
 
 
-class UserManager(BaseUserManager):
+USER_SEARCH_FIELDS = ("first_name", "last_name", "email")
+
+
+class UserQuerySet(models.QuerySet):
+    def search(self, text: str):
+        """Users fuzzily matching the text, annotated with `similarity`.
+
+        A user matches when the text is similar to a word of the first name,
+        last name or email (so prefixes match while typing) or to the whole
+        field (so small typos match). Every condition is served by the
+        trigram index of its field.
+        """
+        matches = models.Q()
+        for field in USER_SEARCH_FIELDS:
+            matches |= models.Q(**{f"{field}__trigram_word_similar": text})
+            matches |= models.Q(**{f"{field}__trigram_similar": text})
+
+        return self.filter(matches).annotate(
+            similarity=Cast(
+                Greatest(
+                    *(
+                        TrigramWordSimilarity(text, field)
+                        for field in USER_SEARCH_FIELDS
+                    )
+                ),
+                models.FloatField()
+            )
+        )
+
+
+class UserManager(BaseUserManager.from_queryset(UserQuerySet)):
     """Define a model manager for User model with no username field."""
 
     use_in_migrations = True
@@ -64,16 +102,21 @@ class User(AbstractUser):
     image = models.ImageField(
         null=True, blank=True, upload_to=user_image_file_path
     )
-    followers = models.ManyToManyField(
-        settings.AUTH_USER_MODEL,
-        related_name="followed_users",
-        blank=True
-    )
+    image_variants = models.JSONField(default=dict, blank=True)
     followings = models.ManyToManyField(
-        settings.AUTH_USER_MODEL,
-        related_name="following_users",
+        "self",
+        through="Follow",
+        through_fields=("follower", "followee"),
+        symmetrical=False,
+        related_name="followers",
         blank=True
     )
+    timeline_built_at = models.DateTimeField(null=True, blank=True)
+    skip_fan_out = models.BooleanField(default=False)
+    follower_count = models.IntegerField(default=0)
+    following_count = models.IntegerField(default=0)
+    post_count = models.IntegerField(default=0)
+    follows_changed_at = models.DateTimeField(null=True, blank=True)
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
@@ -86,22 +129,204 @@ class User(AbstractUser):
 
     class Meta:
         ordering = ["email"]
+        indexes = [
+            models.Index(
+                fields=["-date_joined", "-id"], name="user_date_joined_idx"
+            ),
+            *(
+                GinIndex(
+                    fields=[field],
+                    opclasses=["gin_trgm_ops"],
+                    name=f"user_{field}_trgm_idx"
+                )
+                for field in USER_SEARCH_FIELDS
+            ),
+        ]
+
+
+def normalize_hashtag(name: str) -> str:
+    return name.strip().lstrip("#").lower()
+
+
+class HashtagQuerySet(models.QuerySet):
+    def resolve(self, names) -> list:
+        """Hashtags with the given names, creating the missing ones.
+
+        Costs one SELECT, plus an INSERT and a SELECT of the inserted rows
+        when some names are new, however many names are passed.
+        """
+        names = list(dict.fromkeys(normalize_hashtag(name) for name in names))
+        hashtags = {
+            hashtag.name: hashtag for hashtag in self.filter(name__in=names)
+        }
+
+        missing = [name for name in names if name not in hashtags]
+        if missing:
+            self.bulk_create(
+                [self.model(name=name) for name in missing],
+                ignore_conflicts=True
+            )
+            hashtags.update(
+                (hashtag.name, hashtag)
+                for hashtag in self.filter(name__in=missing)
+            )
+
+        return [hashtags[name] for name in names]
+
+
+class Follow(models.Model):
+    """Single edge of the follow graph: `follower` follows `followee`."""
+
+    follower = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="following_edges"
+    )
+    followee = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="follower_edges"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["follower", "followee"], name="unique_follow"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["followee", "follower"], name="follow_followee_idx"
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.follower_id} -> {self.followee_id}"
+
+
+class FollowSuggestion(models.Model):
+    """Precomputed friend-of-friend suggestion ranked by mutual follows."""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="follow_suggestions"
+    )
+    suggested = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="+"
+    )
+    mutual_count = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ["-mutual_count", "suggested"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "suggested"], name="unique_follow_suggestion"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "-mutual_count", "suggested"],
+                name="suggestion_user_rank_idx"
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.user_id}: {self.suggested_id} ({self.mutual_count})"
 
 
 class Hashtag(models.Model):
-    name = models.CharField(max_length=50)
+    # Being unique, the name also gets a varchar_pattern_ops index serving
+    # prefix (LIKE 'abc%') lookups.
+    name = models.CharField(max_length=50, unique=True)
+    post_count = models.IntegerField(default=0)
+
+    objects = HashtagQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        self.name = normalize_hashtag(self.name)
+        super().save(*args, **kwargs)
 
     def __str__(self) -> str:
         return self.name
 
 
+class HashtagActivity(models.Model):
+    """Number of times a hashtag was attached to posts within a time bucket."""
+
+    hashtag = models.ForeignKey(
+        Hashtag,
+        on_delete=models.CASCADE,
+        related_name="activity"
+    )
+    bucket_start = models.DateTimeField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "hashtag activity"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["hashtag", "bucket_start"],
+                name="unique_hashtag_activity_bucket"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["bucket_start"], name="hashtag_activity_bucket_idx"
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.hashtag_id} @ {self.bucket_start}: {self.count}"
+
+
 def post_image_file_path(instance, filename: str):
     _, extension = os.path.splitext(filename)
-    filename = f"{slugify(instance.title)}-{uuid.uuid4()}{extension}"
+    post = instance.post if isinstance(instance, PostImage) else instance
+    filename = f"{slugify(post.title)}-{uuid.uuid4()}{extension}"
 
     return os.path.join("uploads", "posts", filename)
 
 
+class PostQuerySet(models.QuerySet):
+    def with_like_status(self, user):
+        """Annotate whether the given user likes each post."""
+        return self.annotate(
+            is_liked=models.Exists(
+                Post.likes.through.objects.filter(
+                    post_id=models.OuterRef("pk"), user_id=user.id
+                )
+            )
+        )
+
+    def with_images(self):
+        """Prefetch the gallery images of the posts in their order."""
+        return self.prefetch_related(
+            models.Prefetch(
+                "images", queryset=PostImage.objects.order_by("position", "id")
+            )
+        )
+
+    def search(self, text: str):
+        """Posts matching a web search style query, annotated with `rank`.
+
+        The rank is cast to double precision so it survives a round trip
+        through a pagination cursor unchanged.
+        """
+        query = SearchQuery(
+            text, config=settings.POST_SEARCH_CONFIG, search_type="websearch"
+        )
+        return self.filter(search_vector=query).annotate(
+            rank=Cast(
+                SearchRank(models.F("search_vector"), query),
+                models.FloatField()
+            )
+        )
+
+
 class Post(models.Model):
     author = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -113,7 +338,9 @@ class Post(models.Model):
     image = models.ImageField(
         null=True, blank=True, upload_to=post_image_file_path
     )
+    image_variants = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     likes = models.ManyToManyField(
         User, related_name="post_like", blank=True
     )
@@ -122,11 +349,61 @@ class Post(models.Model):
     )
     published = models.BooleanField(default=True)
     publish_time = models.DateTimeField(null=True, blank=True)
+    like_count = models.IntegerField(default=0)
+    comment_count = models.IntegerField(default=0)
+    # Title, hashtag names and content; maintained by database triggers.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["-created_at", "-id"], name="post_created_idx"
+            ),
+            # Feeds, profiles and timeline backfills read the latest
+            # published posts of given authors.
+            models.Index(
+                fields=["author", "-created_at", "-id"],
+                condition=models.Q(published=True),
+                name="post_author_published_idx"
+            ),
+            # The scheduler looks for due posts among the unpublished ones.
+            models.Index(
+                fields=["publish_time"],
+                condition=models.Q(published=False),
+                name="post_scheduled_idx"
+            ),
+            GinIndex(fields=["search_vector"], name="post_search_vector_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.title} (author: {self.author})"
 
 
+class PostImage(models.Model):
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="images"
+    )
+    image = models.ImageField(upload_to=post_image_file_path)
+    image_variants = models.JSONField(default=dict, blank=True)
+    position = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ["position", "id"]
+        indexes = [
+            models.Index(
+                fields=["post", "position", "id"],
+                name="post_image_position_idx"
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.post_id} #{self.position}"
+
+
 class Comment(models.Model):
     author = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -144,7 +421,72 @@ class Comment(models.Model):
     class Meta:
         ordering = ["-created_at"]
         verbose_name_plural = "comments"
+        indexes = [
+            models.Index(
+                fields=["post", "-created_at", "-id"],
+                name="comment_post_created_idx"
+            )
+        ]
 
     def __str__(self):
         return f"{self.author.email} " \
                f"{self.created_at.strftime('%Y-%m-%d %H:%M')}"
+
+
+class TimelineEntry(models.Model):
+    """Materialized home timeline row: `post` is shown in `owner`'s feed."""
+
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="timeline_entries"
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="timeline_entries"
+    )
+    created_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ["-created_at", "-post"]
+        verbose_name_plural = "timeline entries"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["owner", "post"], name="unique_timeline_entry"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["owner", "-created_at", "-post"],
+                name="timeline_owner_created_idx"
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.owner_id}: {self.post_id}"
+
+
+class MediaBlob(models.Model):
+    """A media file stored once under the digest of its content.
+
+    `ref_count` is the number of image fields and variants referring to the
+    file; blobs nobody refers to are garbage collected once they were not
+    touched for a grace period.
+    """
+
+    name = models.CharField(max_length=255, unique=True)
+    ref_count = models.IntegerField(default=0)
+    touched_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["touched_at"],
+                condition=models.Q(ref_count__lte=0),
+                name="media_blob_unreferenced_idx"
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.name}: {self.ref_count}"
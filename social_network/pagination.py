@@ -0,0 +1,146 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Seek-based pagination over a unique ordering such as (created_at, id).
+
+    The cursor is an opaque token holding the ordering values of the last
+    row of the page, so every page is a single index range scan regardless
+    of how deep the client has paged. The ordering is taken from the
+    queryset's explicit `order_by()` (falling back to `ordering`) and its
+    last field must be unique.
+    """
+
+    cursor_query_param = "cursor"
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("-created_at", "-id")
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+
+        results = list(self.page_queryset(queryset, request))
+        self.has_next = len(results) > page_size
+        self.page = results[:page_size]
+
+        return self.page
+
+    def page_queryset(self, queryset, request):
+        """The rows of the requested page plus the first of the next one."""
+        self.ordering = queryset.query.order_by or self.ordering
+        page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            try:
+                queryset = queryset.filter(self.seek_filter(cursor))
+            except (DjangoValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+
+        return queryset[:page_size + 1]
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+
+        return min(max(page_size, 1), self.max_page_size)
+
+    def seek_filter(self, cursor) -> Q:
+        """Rows strictly after the cursor in lexicographic ordering."""
+        fields = [field.lstrip("-") for field in self.ordering]
+        lookups = [
+            "lt" if field.startswith("-") else "gt" for field in self.ordering
+        ]
+
+        seek = Q()
+        for position, (field, lookup) in enumerate(zip(fields, lookups)):
+            condition = Q(**{f"{field}__{lookup}": cursor[position]})
+            for previous in range(position):
+                condition &= Q(**{fields[previous]: cursor[previous]})
+            seek |= condition
+
+        # Bound the leading column so the database can seek on its index.
+        leading = Q(**{f"{fields[0]}__{lookups[0]}e": cursor[0]})
+        return leading & seek
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode()))
+        except (BinasciiError, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(cursor, list) or len(cursor) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        return cursor
+
+    def encode_cursor(self, instance) -> str:
+        values = [
+            getattr(instance, field.lstrip("-")) for field in self.ordering
+        ]
+        data = json.dumps(values, default=str)
+        return urlsafe_b64encode(data.encode()).decode()
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.page[-1])
+        )
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {
+                    "type": "string",
+                    "nullable": True,
+                    "format": "uri",
+                },
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "The pagination cursor value.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Number of results to return per page.",
+                "schema": {"type": "integer"},
+            },
+        ]
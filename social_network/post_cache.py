@@ -0,0 +1,75 @@
+"""Cached post detail responses, versioned per post.
+
+Every post has a version token in the cache; the serialized detail of the
+post is stored under a key that includes it and the token doubles as the
+ETag. Details embed absolute URLs, so they are stored per origin the API
+is reached at. Write paths touching a post drop its version, which orphans the
+stored detail and changes the ETag at once.
+"""
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import quote_etag
+
+from social_network import graph
+
+
+def version_key(post_id: int) -> str:
+    return f"post-detail:{post_id}:version"
+
+
+def detail_key(post_id: int, version: str, origin: str) -> str:
+    return f"post-detail:{post_id}:{version}:{origin}"
+
+
+def get_version(post_id: int) -> str:
+    version = uuid4().hex
+    if cache.add(
+        version_key(post_id), version, settings.POST_DETAIL_CACHE_TIMEOUT
+    ):
+        return version
+
+    # Evicted since the add found it; the details under it are orphaned.
+    return cache.get(version_key(post_id), version)
+
+
+def get_etag(post_id: int, version: str) -> str:
+    return quote_etag(f"post-{post_id}-{version}")
+
+
+def get_detail(post_id: int, version: str, origin: str):
+    """Cached detail as a dict with `author_id`, `published` and `data`."""
+    return cache.get(detail_key(post_id, version, origin))
+
+
+def set_detail(post, version: str, origin: str, data) -> dict:
+    detail = {
+        "author_id": post.author_id,
+        "published": post.published,
+        "data": data,
+    }
+    cache.set(
+        detail_key(post.id, version, origin),
+        detail,
+        settings.POST_DETAIL_CACHE_TIMEOUT,
+    )
+    return detail
+
+
+def is_visible(detail: dict, user) -> bool:
+    """Whether the post detail belongs in the user's feed."""
+    return detail["published"] and (
+        detail["author_id"] == user.id
+        or graph.is_following(user.id, detail["author_id"])
+    )
+
+
+def invalidate(post_id: int) -> None:
+    """Drop the post's version now and again on commit, so a concurrent
+    read cannot store details loaded before the change under a new one.
+    """
+    key = version_key(post_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
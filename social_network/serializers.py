@@ -1,11 +1,50 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.db.models import F
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
 
-from social_network.models import Post, Comment, Hashtag
+from social_network import images, trending
+from social_network.authentication import invalidate_user
+from social_network.models import (
+    Post,
+    PostImage,
+    Comment,
+    Hashtag,
+    FollowSuggestion,
+    normalize_hashtag,
+)
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """Variants of an image as a srcset-style map of sizes and URLs."""
+
+    def to_representation(self, value):
+        request = self.context.get("request")
+
+        representation = {}
+        for variant, rendition in value.items():
+            representation[variant] = {
+                "width": rendition["width"],
+                "height": rendition["height"],
+            }
+            for extension in images.VARIANT_FORMATS:
+                url = default_storage.url(rendition[extension])
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                representation[variant][extension] = url
+
+        return representation
 
 
 class UserSerializer(serializers.ModelSerializer):
+    # Clients get the variants only; the original keeps its metadata and
+    # is replaced through upload-image, which renders them.
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = get_user_model()
         fields = (
@@ -17,7 +56,7 @@ class UserSerializer(serializers.ModelSerializer):
             "is_staff",
             "followers",
             "followings",
-            "image",
+            "image_variants",
             "bio"
         )
         read_only_fields = ("is_staff",)
@@ -32,18 +71,19 @@ class UserSerializer(serializers.ModelSerializer):
         if password:
             user.set_password(password)
             user.save()
+        invalidate_user(user.id)
 
         return user
 
 
 class UserListSerializer(UserSerializer):
     followers = serializers.IntegerField(
-        source="followers.count", read_only=True
+        source="follower_count", read_only=True
     )
     followings = serializers.IntegerField(
-        source="followings.count", read_only=True
+        source="following_count", read_only=True
     )
-    posts = serializers.IntegerField(source="posts.count", read_only=True)
+    posts = serializers.IntegerField(source="post_count", read_only=True)
 
     class Meta:
         model = get_user_model()
@@ -53,17 +93,27 @@ class UserListSerializer(UserSerializer):
             "email",
             "first_name",
             "last_name",
-            "image",
+            "image_variants",
             "posts",
             "followers",
             "followings"
         )
 
 
+class FollowSuggestionSerializer(serializers.ModelSerializer):
+    user = UserListSerializer(source="suggested", read_only=True)
+
+    class Meta:
+        model = FollowSuggestion
+        fields = ("user", "mutual_count")
+
+
 class UserImageSerializer(serializers.ModelSerializer):
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = get_user_model()
-        fields = ("id", "image")
+        fields = ("id", "image", "image_variants")
 
 
 class CommentSerializer(serializers.ModelSerializer):
@@ -82,8 +132,8 @@ class HashtagField(serializers.CharField):
         return f"#{value}"
 
     def to_internal_value(self, data):
-        hashtag_value = data.lstrip('#')
-        return super().to_internal_value(hashtag_value)
+        hashtag_value = super().to_internal_value(data)
+        return normalize_hashtag(hashtag_value)
 
 
 class HashtagSerializer(serializers.ModelSerializer):
@@ -93,19 +143,54 @@ class HashtagSerializer(serializers.ModelSerializer):
         model = Hashtag
         fields = ("id", "name")
 
+    def validate_name(self, value):
+        # Nested under a post, existing hashtags are reused instead.
+        if self.parent is None:
+            duplicates = Hashtag.objects.filter(name=value)
+            if self.instance is not None:
+                duplicates = duplicates.exclude(id=self.instance.id)
+            if duplicates.exists():
+                raise ValidationError("Hashtag with this name already exists.")
+        return value
+
 
 class HashtagListSerializer(HashtagSerializer):
-    posts = serializers.IntegerField(source="posts.count", read_only=True)
+    posts = serializers.IntegerField(source="post_count", read_only=True)
 
     class Meta:
         model = Hashtag
         fields = ("id", "name", "posts")
 
 
-class PostImageSerializer(serializers.ModelSerializer):
+class TrendingHashtagSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    uses = serializers.IntegerField()
+
+
+class PostImageUploadSerializer(serializers.ModelSerializer):
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = Post
-        fields = ("id", "image")
+        fields = ("id", "image", "image_variants")
+
+
+class PostImageSerializer(serializers.ModelSerializer):
+    # Originals keep their metadata; clients only get the variants.
+    image_variants = ImageVariantsField()
+
+    class Meta:
+        model = PostImage
+        fields = ("id", "position", "image_variants")
+
+
+class PostImagesUploadSerializer(serializers.Serializer):
+    images = serializers.ListField(
+        child=serializers.ImageField(),
+        allow_empty=False,
+        max_length=settings.POST_IMAGES_MAX,
+    )
 
 
 class PostSerializer(serializers.ModelSerializer):
@@ -113,6 +198,7 @@ class PostSerializer(serializers.ModelSerializer):
     hashtags = HashtagSerializer(many=True, required=False)
     images = PostImageSerializer(many=True, read_only=True)
     comments = CommentSerializer(many=True, read_only=True)
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Post
@@ -124,6 +210,7 @@ class PostSerializer(serializers.ModelSerializer):
             "created_at",
             "hashtags",
             "images",
+            "image_variants",
             "published",
             "publish_time",
             "comments"
@@ -135,9 +222,8 @@ class PostSerializer(serializers.ModelSerializer):
         post = Post.objects.create(**validated_data)
 
         if hashtag_data:
-            for hashtag_name in hashtag_data:
-                hashtag, _ = Hashtag.objects.get_or_create(name=hashtag_name["name"])
-                post.hashtags.add(hashtag)
+            hashtag_ids = self.attach_hashtags(post, hashtag_data)
+            trending.record_usage(hashtag_ids)
 
         return post
 
@@ -146,12 +232,39 @@ class PostSerializer(serializers.ModelSerializer):
         instance = super().update(instance, validated_data)
 
         if hashtag_data:
-            for hashtag_name in hashtag_data:
-                hashtag, _ = Hashtag.objects.get_or_create(name=hashtag_name["name"])
-                instance.hashtags.add(hashtag)
+            hashtag_ids = self.attach_hashtags(instance, hashtag_data)
+            trending.record_usage(hashtag_ids)
 
         return instance
 
+    @staticmethod
+    def attach_hashtags(post, hashtag_data) -> list:
+        """Attach the hashtags to the post in bulk, creating missing ones.
+
+        Returns the ids of the hashtags that were not attached before.
+        """
+        hashtags = Hashtag.objects.resolve(
+            hashtag["name"] for hashtag in hashtag_data if hashtag.get("name")
+        )
+        attached_ids = set(post.hashtags.values_list("id", flat=True))
+        new_ids = [
+            hashtag.id for hashtag in hashtags
+            if hashtag.id not in attached_ids
+        ]
+
+        Post.hashtags.through.objects.bulk_create(
+            [
+                Post.hashtags.through(post_id=post.id, hashtag_id=hashtag_id)
+                for hashtag_id in new_ids
+            ],
+            ignore_conflicts=True
+        )
+        Hashtag.objects.filter(id__in=new_ids).update(
+            post_count=F("post_count") + 1
+        )
+
+        return new_ids
+
     def validate(self, data):
         if not data.get("published") and data.get("publish_time") is None:
             raise ValidationError("Enter the publication date")
@@ -165,10 +278,10 @@ class PostListSerializer(PostSerializer):
     hashtags = serializers.SlugRelatedField(
         many=True, slug_field="name", read_only=True
     )
-    likes = serializers.IntegerField(source="likes.count", read_only=True)
+    likes = serializers.IntegerField(source="like_count", read_only=True)
     is_liked = serializers.BooleanField(read_only=True)
     comments = serializers.IntegerField(
-        source="comments.count", read_only=True
+        source="comment_count", read_only=True
     )
 
     class Meta:
@@ -179,6 +292,7 @@ class PostListSerializer(PostSerializer):
             "author",
             "hashtags",
             "images",
+            "image_variants",
             "published",
             "publish_time",
             "likes",
@@ -190,7 +304,7 @@ class PostListSerializer(PostSerializer):
 class PostDetailSerializer(PostSerializer):
     author = UserListSerializer(many=False, read_only=True)
     comments = CommentSerializer(many=True, read_only=True)
-    likes = serializers.IntegerField(source="likes.count", read_only=True)
+    likes = serializers.IntegerField(source="like_count", read_only=True)
 
     class Meta:
         model = Post
@@ -201,14 +315,31 @@ class PostDetailSerializer(PostSerializer):
             "author",
             "created_at",
             "images",
+            "image_variants",
             "likes",
             "comments"
         )
 
 
 class HashtagDetailSerializer(HashtagSerializer):
-    posts = PostListSerializer(read_only=True, many=True)
+    posts = serializers.SerializerMethodField()
 
     class Meta:
         model = Hashtag
         fields = ("id", "name", "posts")
+
+    @extend_schema_field(PostListSerializer(many=True))
+    def get_posts(self, hashtag):
+        """Latest posts only; the rest is paged via /hashtags/{id}/posts/."""
+        request = self.context.get("request")
+        posts = hashtag.posts.filter(published=True).select_related(
+            "author"
+        ).prefetch_related("hashtags").with_images().order_by(
+            "-created_at", "-id"
+        )
+        if request is not None:
+            posts = posts.with_like_status(request.user)
+
+        posts = posts[:api_settings.PAGE_SIZE]
+
+        return PostListSerializer(posts, many=True, context=self.context).data
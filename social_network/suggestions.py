@@ -0,0 +1,94 @@
+"""Friend-of-friend follow suggestions, precomputed in batches of users."""
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Window
+from django.db.models.functions import RowNumber
+
+from social_network.models import Follow, FollowSuggestion, User
+
+
+def rank_suggestions(user_ids):
+    """Best candidates for each user as (user_id, suggested_id, mutual_count).
+
+    A candidate is followed by someone the user follows, is not the user
+    and is not followed by them yet; candidates reached through more
+    followees rank higher.
+    """
+    already_followed = Follow.objects.filter(
+        follower_id=OuterRef("user_id"), followee_id=OuterRef("followee_id")
+    )
+
+    return (
+        Follow.objects.filter(
+            follower__follower_edges__follower_id__in=user_ids
+        )
+        .annotate(user_id=F("follower__follower_edges__follower_id"))
+        .exclude(followee_id=F("user_id"))
+        .exclude(Exists(already_followed))
+        .values("user_id", "followee_id")
+        .annotate(mutual_count=Count("*"))
+        .annotate(
+            rank=Window(
+                RowNumber(),
+                partition_by=F("user_id"),
+                order_by=[F("mutual_count").desc(), F("followee_id")],
+            )
+        )
+        .filter(rank__lte=settings.FOLLOW_SUGGESTIONS_SIZE)
+        .values_list("user_id", "followee_id", "mutual_count")
+    )
+
+
+def store_suggestions(user_ids) -> None:
+    suggestions = [
+        FollowSuggestion(
+            user_id=user_id, suggested_id=suggested_id, mutual_count=mutual
+        )
+        for user_id, suggested_id, mutual in rank_suggestions(user_ids)
+    ]
+
+    with transaction.atomic():
+        FollowSuggestion.objects.filter(user_id__in=user_ids).delete()
+        FollowSuggestion.objects.bulk_create(suggestions)
+
+
+def stale_user_ids(since):
+    """Users whose suggestions may have changed since the given time.
+
+    Those are the users who followed or unfollowed someone and their
+    followers, whose second hop runs through them. Without a previous run
+    every user is stale.
+    """
+    if since is None:
+        return User.objects.order_by("id").values_list("id", flat=True)
+
+    changed = User.objects.filter(follows_changed_at__gte=since).values("id")
+    followers = Follow.objects.filter(followee_id__in=changed).values(
+        "follower_id"
+    )
+
+    return (
+        User.objects.filter(id__in=changed)
+        .values_list("id", flat=True)
+        .order_by()
+        .union(
+            User.objects.filter(id__in=followers)
+            .values_list("id", flat=True)
+            .order_by()
+        )
+    )
+
+
+def refresh_suggestions(since=None) -> int:
+    """Recompute suggestions of stale users; returns how many were done."""
+    batch_size = settings.FOLLOW_SUGGESTIONS_BATCH_SIZE
+    user_ids = stale_user_ids(since).iterator(chunk_size=batch_size)
+
+    refreshed = 0
+    while batch := list(islice(user_ids, batch_size)):
+        store_suggestions(batch)
+        refreshed += len(batch)
+
+    return refreshed
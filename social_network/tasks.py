@@ -1,8 +1,20 @@
-from datetime import datetime
+from datetime import timedelta
 
-from django.db.models import Q
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
 
-from social_network.models import Post
+from social_network import (
+    images,
+    media,
+    post_cache,
+    suggestions,
+    timeline,
+    trending,
+)
+from social_network.models import Post, User
 
 from celery import shared_task
 
@@ -12,11 +24,148 @@ def count_posts() -> int:
     return Post.objects.count()
 
 
+def publish_due_posts(batch_size: int) -> list:
+    """Publish up to `batch_size` due posts in one UPDATE ... RETURNING.
+
+    Rows locked by a concurrent run are skipped rather than waited for, so
+    several workers drain the backlog in parallel without overlapping.
+    """
+    due = (
+        Post.objects.filter(published=False, publish_time__lte=timezone.now())
+        .order_by("publish_time")
+        .select_for_update(skip_locked=True)
+        .values("id")[:batch_size]
+    )
+
+    with transaction.atomic():
+        sql, params = due.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {Post._meta.db_table} SET published = TRUE "
+                f"WHERE id IN ({sql}) RETURNING id",
+                params,
+            )
+            post_ids = [post_id for post_id, in cursor.fetchall()]
+
+        for post_id in post_ids:
+            post_cache.invalidate(post_id)
+            transaction.on_commit(
+                lambda post_id=post_id: fan_out_post.delay(post_id)
+            )
+
+    return post_ids
+
+
+@shared_task
+def publish_post(post_id: int) -> bool:
+    """Publish a scheduled post whose publish time has come.
+
+    Running it again, ahead of a rescheduled publish time or after the
+    sweeper got to the post first changes nothing.
+    """
+    published = Post.objects.filter(
+        id=post_id, published=False, publish_time__lte=timezone.now()
+    ).update(published=True)
+    if published:
+        post_cache.invalidate(post_id)
+        fan_out_post(post_id)
+
+    return bool(published)
+
+
+def schedule_publishing(post_id: int, publish_time) -> bool:
+    """Enqueue publish_post for the publish time if it is near enough.
+
+    The Redis broker redelivers a task it held unacknowledged for longer
+    than its visibility timeout, so tasks are only scheduled that far
+    ahead; the sweeper schedules later posts once they come close.
+    """
+    horizon = timezone.now() + timedelta(
+        seconds=settings.CELERY_BROKER_TRANSPORT_OPTIONS["visibility_timeout"]
+    )
+    if publish_time > horizon:
+        return False
+
+    publish_post.apply_async((post_id,), eta=publish_time)
+    return True
+
+
+@shared_task
+def publish_posts() -> int:
+    """Sweep up due posts whose publish_post task never ran and schedule
+    the ones coming due before the next sweep.
+    """
+    batch_size = settings.PUBLISH_POSTS_BATCH_SIZE
+
+    published = 0
+    while post_ids := publish_due_posts(batch_size):
+        published += len(post_ids)
+
+    upcoming = Post.objects.filter(
+        published=False,
+        publish_time__lte=timezone.now() + settings.PUBLISH_POSTS_INTERVAL,
+    ).values_list("id", "publish_time")
+    for post_id, publish_time in upcoming:
+        schedule_publishing(post_id, publish_time)
+
+    return published
+
+
+@shared_task
+def fan_out_post(post_id: int) -> None:
+    post = Post.objects.filter(id=post_id, published=True).first()
+    if post is not None:
+        timeline.fan_out_post(post)
+
+
 @shared_task
-def publish_posts() -> None:
-    posts = Post.objects.filter(
-        Q(publish_time__lte=datetime.now()) & Q(published=False)
+def rebuild_timeline(user_id: int) -> None:
+    user = User.objects.filter(id=user_id).first()
+    if user is not None:
+        timeline.rebuild_timeline(user)
+
+
+@shared_task
+def compute_follow_suggestions() -> int:
+    """Refresh suggestions of users whose follow edges changed since the
+    previous run, or of everybody on the first run.
+    """
+    started_at = timezone.now()
+    refreshed = suggestions.refresh_suggestions(
+        since=cache.get("follow-suggestions:last-run")
     )
-    for post in posts:
-        post.published = True
-        post.save()
+    cache.set("follow-suggestions:last-run", started_at, timeout=None)
+
+    return refreshed
+
+
+@shared_task
+def prune_hashtag_activity() -> int:
+    return trending.prune_activity()
+
+
+@shared_task
+def render_image_variants(model_name: str, pk: int) -> None:
+    """Render the variants of the image of a user, post or post image."""
+    model = apps.get_model("social_network", model_name)
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None or not instance.image:
+        return
+
+    images.process_image(instance)
+    post_id = pk if model is Post else getattr(instance, "post_id", None)
+    if post_id is not None:
+        Post.objects.filter(id=post_id).update(updated_at=timezone.now())
+        post_cache.invalidate(post_id)
+
+
+@shared_task
+def collect_media_garbage() -> int:
+    """Delete media blobs nobody refers to anymore, batch by batch."""
+    batch_size = settings.MEDIA_GC_BATCH_SIZE
+
+    collected = 0
+    while deleted := media.collect_garbage(batch_size):
+        collected += deleted
+
+    return collected
@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
 from django.urls import reverse
 
@@ -11,6 +12,9 @@ from social_network.serializers import CommentSerializer
 
 
 class UnauthenticatedCommentApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
     def test_auth_required(self):
         self.client = APIClient()
         self.user = get_user_model().objects.create_user(
@@ -37,6 +41,7 @@ class UnauthenticatedCommentApiTests(TestCase):
 
 class AuthenticatedCommentApiTests(TestCase):
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.user = get_user_model().objects.create_user(
             email="john_simmons@test.com",
@@ -68,6 +73,9 @@ class AuthenticatedCommentApiTests(TestCase):
         comment = Comment.objects.get(id=resp.data["id"])
         self.assertEqual(payload["content"], comment.content)
 
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
     def test_get_comment_detail(self):
         comment = Comment.objects.create(
             author=self.user,
@@ -79,7 +87,7 @@ class AuthenticatedCommentApiTests(TestCase):
         serializer = CommentSerializer(comment)
 
         self.assertEqual(resp.status_code, status.HTTP_200_OK)
-        self.assertEqual(resp.data[0], serializer.data)
+        self.assertEqual(resp.data["results"][0], serializer.data)
 
     def test_get_comment_list(self):
         comment_number = 3
@@ -92,12 +100,34 @@ class AuthenticatedCommentApiTests(TestCase):
         comments_url = reverse("social_network:comment-list")
         resp = self.client.get(comments_url, {"post_id": {self.post.id}})
         self.assertEqual(resp.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(resp.data), comment_number)
+        self.assertEqual(len(resp.data["results"]), comment_number)
 
         comments = Comment.objects.all()
         serializer = CommentSerializer(comments, many=True)
 
-        self.assertEqual(resp.data, serializer.data)
+        self.assertEqual(resp.data["results"], serializer.data)
+
+    def test_comment_list_not_modified(self):
+        comment = Comment.objects.create(
+            author=self.user, post=self.post, content="Comment #1"
+        )
+        comments_url = reverse("social_network:comment-list")
+        params = {"post_id": self.post.id}
+        etag = self.client.get(comments_url, params)["ETag"]
+
+        resp = self.client.get(comments_url, params, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(resp["ETag"], etag)
+
+        self.client.patch(
+            reverse("social_network:comment-detail", args=[comment.id]),
+            data={"content": "Edited comment"}
+        )
+        resp = self.client.get(comments_url, params, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data["results"][0]["content"], "Edited comment")
 
     def test_update_comment(self):
         comment = Comment.objects.create(
@@ -1,9 +1,18 @@
+import json
 import tempfile
+from base64 import urlsafe_b64encode
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest.mock import patch
 
 from PIL import Image
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.http import Http404
+from django.test import RequestFactory, TestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.text import slugify
@@ -12,11 +21,34 @@ from rest_framework import status
 from rest_framework.test import APIClient
 from rest_framework_simplejwt.tokens import RefreshToken
 
-from social_network.models import Post, post_image_file_path, Hashtag
+from social_network import images, media
+from social_network.models import (
+    Post,
+    post_image_file_path,
+    Hashtag,
+    TimelineEntry,
+    Comment,
+    HashtagActivity,
+    MediaBlob,
+    PostImage,
+)
 from social_network.serializers import PostListSerializer
+from social_network.tasks import (
+    collect_media_garbage,
+    fan_out_post,
+    rebuild_timeline,
+    prune_hashtag_activity,
+    publish_post,
+    publish_posts,
+    render_image_variants,
+)
+from social_network.trending import bucket_start
 
 
 class UnauthenticatedPostApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
     def test_auth_required(self):
         self.client = APIClient()
         self.user = get_user_model().objects.create_user(
@@ -37,6 +69,7 @@ class UnauthenticatedPostApiTests(TestCase):
 
 class AuthenticatedPostApiTests(TestCase):
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.user = get_user_model().objects.create_user(
             email="test_user@test.com",
@@ -111,15 +144,51 @@ class AuthenticatedPostApiTests(TestCase):
 
         self.assertEqual(resp.status_code, status.HTTP_200_OK)
 
-        target_posts = [self.post, follower_post]
+        target_posts = Post.objects.filter(
+            id__in=[follower_post.id, self.post.id]
+        ).with_like_status(self.user).order_by("-created_at", "-id")
         serializer = PostListSerializer(target_posts, many=True)
 
-        self.assertEqual(resp.data, serializer.data)
+        self.assertEqual(resp.data["results"], serializer.data)
 
-        post_ids_in_resp = [post["id"] for post in resp.data]
+        post_ids_in_resp = [post["id"] for post in resp.data["results"]]
 
         self.assertNotIn(non_follower_post.id, post_ids_in_resp)
 
+    def test_list_posts_paginated_by_cursor(self):
+        posts = [self.post] + [
+            Post.objects.create(
+                author=self.user,
+                title=f"Test post {i}",
+                content="Test post content"
+            )
+            for i in range(4)
+        ]
+        url = reverse("social_network:post-list")
+
+        resp = self.client.get(url, {"page_size": 2})
+        received = [p["id"] for p in resp.data["results"]]
+        while resp.data["next"]:
+            resp = self.client.get(resp.data["next"])
+            self.assertLessEqual(len(resp.data["results"]), 2)
+            received += [p["id"] for p in resp.data["results"]]
+
+        self.assertEqual(received, [post.id for post in reversed(posts)])
+
+    def test_list_posts_invalid_cursor(self):
+        url = reverse("social_network:post-list")
+        resp = self.client.get(url, {"cursor": "not-a-cursor"})
+
+        self.assertEqual(resp.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_posts_cursor_with_invalid_values(self):
+        url = reverse("social_network:post-list")
+        for values in (["x", 1], [None, 1], [{"a": 1}, 2]):
+            cursor = urlsafe_b64encode(json.dumps(values).encode()).decode()
+            resp = self.client.get(url, {"cursor": cursor})
+
+            self.assertEqual(resp.status_code, status.HTTP_404_NOT_FOUND)
+
     def test_filter_by_hashtag(self):
         hashtag_names = {"economy", "innovations"}
         hashtags = {
@@ -161,9 +230,11 @@ class AuthenticatedPostApiTests(TestCase):
 
         self.assertEqual(resp.status_code, status.HTTP_200_OK)
 
-        self.assertEqual(set(p["id"] for p in resp.data), economy_posts)
+        self.assertEqual(
+            set(p["id"] for p in resp.data["results"]), economy_posts
+        )
 
-        for post in resp.data:
+        for post in resp.data["results"]:
             post_hashtags = set(post["hashtags"])
             self.assertTrue("economy" in post_hashtags)
 
@@ -190,14 +261,54 @@ class AuthenticatedPostApiTests(TestCase):
         resp = self.client.get(url, {"title": "manage"})
 
         self.assertEqual(resp.status_code, status.HTTP_200_OK)
-        self.assertEqual(set(p["id"] for p in resp.data), manage_posts)
+        self.assertEqual(
+            set(p["id"] for p in resp.data["results"]), manage_posts
+        )
 
-        post_titles = [item["title"].lower() for item in resp.data]
+        post_titles = [item["title"].lower() for item in resp.data["results"]]
 
         self.assertTrue(
             any(["manage" in t for t in post_titles])
         )
 
+    def test_search(self):
+        title_match = Post.objects.create(
+            author=self.user,
+            title="Renewable energy",
+            content="Wind farms"
+        )
+        content_match = Post.objects.create(
+            author=self.user,
+            title="Weekly digest",
+            content="Subsidies for renewable energy keep growing"
+        )
+        hashtag_match = Post.objects.create(
+            author=self.user,
+            title="Solar panels",
+            content="Roof installation"
+        )
+        hashtag_match.hashtags.add(Hashtag.objects.create(name="energy"))
+
+        url = reverse("social_network:post-list")
+        resp = self.client.get(url, {"search": "renewable energy"})
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [p["id"] for p in resp.data["results"]],
+            [title_match.id, content_match.id]
+        )
+
+        resp = self.client.get(url, {"search": "energy", "page_size": 2})
+        next_page = self.client.get(resp.data["next"])
+
+        self.assertEqual(
+            [p["id"] for p in resp.data["results"]],
+            [hashtag_match.id, title_match.id]
+        )
+        self.assertEqual(
+            [p["id"] for p in next_page.data["results"]], [content_match.id]
+        )
+
     def test_filter_by_author_last_name(self):
         user2 = get_user_model().objects.create_user(
             email="nick_larson@test.com",
@@ -242,9 +353,11 @@ class AuthenticatedPostApiTests(TestCase):
         resp = self.client.get(url, {"author_last_name": "son"})
 
         self.assertEqual(resp.status_code, status.HTTP_200_OK)
-        self.assertEqual(set(p["id"] for p in resp.data), target_posts)
+        self.assertEqual(
+            set(p["id"] for p in resp.data["results"]), target_posts
+        )
 
-        authors = [item["author"].lower() for item in resp.data]
+        authors = [item["author"].lower() for item in resp.data["results"]]
         self.assertTrue(
             any(["son" in t for t in authors])
         )
@@ -268,6 +381,9 @@ class AuthenticatedPostApiTests(TestCase):
         self.assertEqual(resp.status_code, status.HTTP_200_OK)
         self.assertIn(self.user, post.likes.all())
 
+        post.refresh_from_db()
+        self.assertEqual(post.like_count, 1)
+
     def test_unlike_post_if_liked(self):
         followed_user = get_user_model().objects.create_user(
             email="john_simmons@test.com",
@@ -353,3 +469,814 @@ class AuthenticatedPostApiTests(TestCase):
         )
 
         self.assertEqual(resp.status_code, status.HTTP_204_NO_CONTENT)
+
+
+class TimelinePostApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test_user@test.com",
+            password="testpass",
+            first_name="Test",
+            last_name="User"
+        )
+        self.followed_user = get_user_model().objects.create_user(
+            email="john_simmons@test.com",
+            password="testpass",
+            first_name="John",
+            last_name="Simmons"
+        )
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}"
+        )
+        self.client.post(
+            reverse(
+                "social_network:user-detail", args=[self.followed_user.id]
+            ) + "follow-unfollow/"
+        )
+
+    def test_list_posts_from_warm_timeline(self):
+        old_post = Post.objects.create(
+            author=self.followed_user,
+            title="Old post",
+            content="Test post content"
+        )
+        rebuild_timeline(self.user.id)
+
+        new_post = Post.objects.create(
+            author=self.followed_user,
+            title="New post",
+            content="Test post content"
+        )
+        url = reverse("social_network:post-list")
+
+        resp = self.client.get(url)
+        self.assertEqual(
+            [p["id"] for p in resp.data["results"]], [old_post.id]
+        )
+
+        fan_out_post(new_post.id)
+
+        resp = self.client.get(url)
+        self.assertEqual(
+            [p["id"] for p in resp.data["results"]], [new_post.id, old_post.id]
+        )
+
+    def test_page_through_warm_timeline(self):
+        posts = [
+            Post.objects.create(
+                author=self.followed_user,
+                title=f"Test post {i}",
+                content="Test post content"
+            )
+            for i in range(3)
+        ]
+        rebuild_timeline(self.user.id)
+
+        ids = []
+        url = reverse("social_network:post-list") + "?page_size=2"
+        while url:
+            resp = self.client.get(url)
+            ids += [p["id"] for p in resp.data["results"]]
+            url = resp.data["next"]
+
+        self.assertEqual(ids, [post.id for post in reversed(posts)])
+
+    def test_fan_out_only_when_post_gets_published(self):
+        post = Post.objects.create(
+            author=self.user,
+            title="Test post",
+            content="Test post content",
+            published=False,
+            publish_time=timezone.now() + timedelta(days=1)
+        )
+        url = reverse("social_network:post-detail", args=[post.id])
+
+        with patch("social_network.views.fan_out_post.delay") as task:
+            for payload in (
+                {"published": True},
+                {"title": "Renamed post", "published": True},
+            ):
+                with self.captureOnCommitCallbacks(execute=True):
+                    resp = self.client.patch(url, payload)
+                self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+        task.assert_called_once_with(post.id)
+
+    def test_unfollow_removes_author_from_timeline(self):
+        Post.objects.create(
+            author=self.followed_user,
+            title="Test post",
+            content="Test post content"
+        )
+        rebuild_timeline(self.user.id)
+
+        self.client.post(
+            reverse(
+                "social_network:user-detail", args=[self.followed_user.id]
+            ) + "follow-unfollow/"
+        )
+
+        self.assertFalse(
+            TimelineEntry.objects.filter(owner=self.user).exists()
+        )
+
+    @override_settings(FEED_FAN_OUT_FOLLOWER_LIMIT=0)
+    def test_high_follower_author_posts_merged_at_read_time(self):
+        own_post = Post.objects.create(
+            author=self.user,
+            title="Own post",
+            content="Test post content"
+        )
+        rebuild_timeline(self.user.id)
+
+        post = Post.objects.create(
+            author=self.followed_user,
+            title="Popular post",
+            content="Test post content"
+        )
+        fan_out_post(post.id)
+
+        self.followed_user.refresh_from_db()
+        self.assertTrue(self.followed_user.skip_fan_out)
+        self.assertFalse(
+            TimelineEntry.objects.filter(owner=self.user, post=post).exists()
+        )
+
+        resp = self.client.get(reverse("social_network:post-list"))
+
+        self.assertEqual(
+            [p["id"] for p in resp.data["results"]], [post.id, own_post.id]
+        )
+
+    @override_settings(TIMELINE_DEPTH=2)
+    def test_timeline_trimmed_to_depth(self):
+        posts = [
+            Post.objects.create(
+                author=self.followed_user,
+                title=f"Test post {i}",
+                content="Test post content"
+            )
+            for i in range(3)
+        ]
+        for post in posts:
+            fan_out_post(post.id)
+
+        entries = TimelineEntry.objects.filter(owner=self.user)
+
+        self.assertEqual(
+            [entry.post_id for entry in entries],
+            [posts[2].id, posts[1].id]
+        )
+
+
+class PublishPostsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(PUBLISH_POSTS_BATCH_SIZE=2)
+    def test_publish_due_posts(self):
+        author = get_user_model().objects.create_user(
+            email="test_user@test.com",
+            password="testpass"
+        )
+        now = timezone.now()
+        due_posts = [
+            Post.objects.create(
+                author=author,
+                title=f"Due post {i}",
+                content="Test post content",
+                published=False,
+                publish_time=now - timezone.timedelta(minutes=i)
+            )
+            for i in range(3)
+        ]
+        scheduled_post = Post.objects.create(
+            author=author,
+            title="Scheduled post",
+            content="Test post content",
+            published=False,
+            publish_time=now + timezone.timedelta(hours=1)
+        )
+
+        with patch("social_network.tasks.fan_out_post.delay") as fan_out:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(publish_posts(), 3)
+
+        self.assertEqual(
+            sorted(call.args[0] for call in fan_out.call_args_list),
+            sorted(post.id for post in due_posts)
+        )
+        self.assertEqual(
+            set(
+                Post.objects.filter(published=True).values_list(
+                    "id", flat=True
+                )
+            ),
+            {post.id for post in due_posts}
+        )
+        scheduled_post.refresh_from_db()
+        self.assertFalse(scheduled_post.published)
+
+
+class PostDetailCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test_user@test.com",
+            password="testpass"
+        )
+        self.client.force_authenticate(self.user)
+        self.post = Post.objects.create(
+            author=self.user, title="Test post", content="Test post content"
+        )
+        self.url = reverse("social_network:post-detail", args=[self.post.id])
+
+    @override_settings(ALLOWED_HOSTS=["api.test", "cdn.test"])
+    def test_detail_urls_follow_requested_host(self):
+        Post.objects.filter(id=self.post.id).update(
+            image_variants={
+                "thumb": {
+                    "width": 160,
+                    "height": 120,
+                    "webp": "blobs/ab/cd/abcd.webp",
+                    "jpeg": "blobs/ab/cd/abcd.jpeg",
+                }
+            }
+        )
+
+        for host in ("api.test", "cdn.test"):
+            resp = self.client.get(self.url, HTTP_HOST=host)
+            self.assertTrue(
+                resp.data["image_variants"]["thumb"]["webp"].startswith(
+                    f"http://{host}/"
+                )
+            )
+
+    def test_detail_served_from_cache_with_etag(self):
+        resp = self.client.get(self.url)
+        etag = resp["ETag"]
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(self.url)
+            not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(cached.data, resp.data)
+        self.assertEqual(
+            not_modified.status_code, status.HTTP_304_NOT_MODIFIED
+        )
+
+        self.client.post(self.url + "like-unlike/")
+        resp = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(resp["ETag"], etag)
+        self.assertEqual(resp.data["likes"], 1)
+
+    def test_cached_detail_hidden_from_non_followers(self):
+        self.client.get(self.url)
+        stranger = get_user_model().objects.create_user(
+            email="stranger@test.com",
+            password="testpass"
+        )
+        self.client.force_authenticate(stranger)
+
+        resp = self.client.get(self.url)
+
+        self.assertEqual(resp.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ConditionalPostListTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test_user@test.com",
+            password="testpass"
+        )
+        self.client.force_authenticate(self.user)
+        self.post = Post.objects.create(
+            author=self.user, title="Test post", content="Test post content"
+        )
+        self.url = reverse("social_network:post-list")
+
+    def test_unchanged_list_not_serialized(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        with patch.object(PostListSerializer, "to_representation") as to_repr:
+            resp = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED)
+        to_repr.assert_not_called()
+
+    def test_etag_changes_with_likes_and_pages(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        resp = self.client.get(
+            self.url, {"page_size": 1}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+        self.client.post(
+            reverse("social_network:post-detail", args=[self.post.id])
+            + "like-unlike/"
+        )
+        resp = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(resp["ETag"], etag)
+        self.assertEqual(resp.data["results"][0]["likes"], 1)
+
+    def test_etag_changes_with_hashtag_rename(self):
+        hashtag = Hashtag.objects.create(name="economy")
+        self.post.hashtags.add(hashtag)
+        hashtag_posts_url = reverse(
+            "social_network:hashtag-detail", args=[hashtag.id]
+        ) + "posts/"
+
+        for url in (self.url, hashtag_posts_url):
+            etag = self.client.get(url)["ETag"]
+            Hashtag.objects.filter(id=hashtag.id).update(
+                name=hashtag.name + "s"
+            )
+            hashtag.refresh_from_db()
+            resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+            self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+    def test_hashtag_list_not_modified(self):
+        Hashtag.objects.create(name="economy")
+        url = reverse("social_network:hashtag-list")
+        etag = self.client.get(url)["ETag"]
+
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Hashtag.objects.create(name="energy")
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+
+class ImageVariantsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test_user@test.com",
+            password="testpass"
+        )
+        self.client.force_authenticate(self.user)
+        self.post = Post.objects.create(
+            author=self.user, title="Test post", content="Test post content"
+        )
+
+    def upload_image(self, image, **params):
+        url = reverse("social_network:post-upload-image", args=[self.post.id])
+        with tempfile.NamedTemporaryFile(suffix=".jpg") as ntf:
+            image.save(ntf, format="JPEG", **params)
+            ntf.seek(0)
+            return self.client.post(url, {"image": ntf}, format="multipart")
+
+    def test_variants_rendered_upright_without_exif(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: rotate 90 degrees clockwise.
+        self.upload_image(Image.new("RGB", (2000, 1000)), exif=exif)
+
+        render_image_variants("post", self.post.id)
+
+        self.post.refresh_from_db()
+        variants = self.post.image_variants
+        self.assertEqual(
+            {
+                variant: (rendition["width"], rendition["height"])
+                for variant, rendition in variants.items()
+            },
+            {"full": (800, 1600), "feed": (360, 720), "thumb": (80, 160)}
+        )
+        for extension, image_format in (("webp", "WEBP"), ("jpeg", "JPEG")):
+            with self.post.image.storage.open(
+                variants["thumb"][extension]
+            ) as variant_file, Image.open(variant_file) as variant:
+                self.assertEqual(variant.format, image_format)
+                self.assertEqual(variant.size, (80, 160))
+                self.assertFalse(variant.getexif())
+
+        resp = self.client.get(reverse("social_network:post-list"))
+        self.assertTrue(
+            resp.data["results"][0]["image_variants"]["feed"]["webp"]
+            .endswith(".webp")
+        )
+
+    def test_replaced_image_keeps_no_stale_variants(self):
+        self.upload_image(Image.new("RGB", (100, 100)))
+        post = Post.objects.get(id=self.post.id)
+        self.upload_image(Image.new("RGB", (200, 200)))
+
+        images.process_image(post)
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.image_variants, {})
+
+
+class MediaStorageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test_user@test.com",
+            password="testpass"
+        )
+        self.client.force_authenticate(self.user)
+        self.posts = [
+            Post.objects.create(
+                author=self.user, title=f"Post {i}", content="Content"
+            )
+            for i in range(2)
+        ]
+
+    def upload_image(self, post, color):
+        url = reverse("social_network:post-upload-image", args=[post.id])
+        with tempfile.NamedTemporaryFile(suffix=".JPG") as ntf:
+            Image.new("RGB", (10, 10), color).save(ntf, format="JPEG")
+            ntf.seek(0)
+            self.client.post(url, {"image": ntf}, format="multipart")
+        post.refresh_from_db()
+
+    def test_same_content_stored_once(self):
+        for post in self.posts:
+            self.upload_image(post, "red")
+
+        first, second = self.posts
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(first.image.name, r"^blobs/\w\w/\w\w/\w{64}\.jpg$")
+        self.assertEqual(
+            MediaBlob.objects.get(name=first.image.name).ref_count, 2
+        )
+
+        self.upload_image(second, "blue")
+
+        self.assertEqual(
+            MediaBlob.objects.get(name=first.image.name).ref_count, 1
+        )
+        self.assertEqual(
+            MediaBlob.objects.get(name=second.image.name).ref_count, 1
+        )
+
+    @override_settings(MEDIA_GC_GRACE_PERIOD=timedelta(0))
+    def test_unreferenced_blobs_collected(self):
+        post = self.posts[0]
+        self.upload_image(post, "green")
+        name = post.image.name
+        self.client.delete(
+            reverse("social_network:post-detail", args=[post.id])
+        )
+
+        self.assertEqual(collect_media_garbage(), 1)
+        self.assertFalse(MediaBlob.objects.filter(name=name).exists())
+        self.assertFalse(default_storage.exists(name))
+
+    @override_settings(MEDIA_SERVING="accel")
+    def test_serve_offloads_to_front_server(self):
+        self.upload_image(self.posts[0], "white")
+        name = self.posts[0].image.name
+        factory = RequestFactory()
+
+        resp = media.serve(factory.get("/media/" + name), name)
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.content, b"")
+        self.assertEqual(resp["X-Accel-Redirect"], "/protected-media/" + name)
+        self.assertEqual(resp["Content-Type"], "image/jpeg")
+        self.assertIn("immutable", resp["Cache-Control"])
+
+        resp = media.serve(
+            factory.get("/media/" + name, HTTP_IF_NONE_MATCH=resp["ETag"]),
+            name
+        )
+        self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        with self.assertRaises(Http404):
+            media.serve(factory.get("/media/"), "../manage.py")
+
+
+class PostImagesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test_user@test.com",
+            password="testpass"
+        )
+        self.client.force_authenticate(self.user)
+        self.post = Post.objects.create(
+            author=self.user, title="Test post", content="Test post content"
+        )
+        self.url = (
+            reverse("social_network:post-detail", args=[self.post.id])
+            + "images/"
+        )
+
+    def image_files(self, *colors):
+        files = []
+        for color in colors:
+            image_file = BytesIO()
+            Image.new("RGB", (10, 10), color).save(image_file, format="PNG")
+            image_file.name = f"{color}.png"
+            image_file.seek(0)
+            files.append(image_file)
+        return files
+
+    def test_upload_several_images(self):
+        with patch("social_network.views.group") as group:
+            with self.captureOnCommitCallbacks(execute=True):
+                resp = self.client.post(
+                    self.url,
+                    {"images": self.image_files("red", "green", "blue")},
+                    format="multipart"
+                )
+
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [image["position"] for image in resp.data], [0, 1, 2]
+        )
+        self.assertEqual(
+            list(
+                PostImage.objects.filter(post=self.post)
+                .values_list("id", flat=True)
+            ),
+            [image["id"] for image in resp.data]
+        )
+        tasks = list(group.call_args.args[0])
+        self.assertEqual(
+            [task.args for task in tasks],
+            [("postimage", image["id"]) for image in resp.data]
+        )
+        group.return_value.delay.assert_called_once()
+
+        resp = self.client.get(reverse("social_network:post-list"))
+        self.assertEqual(len(resp.data["results"][0]["images"]), 3)
+        self.assertNotIn("image", resp.data["results"][0]["images"][0])
+
+    @override_settings(POST_IMAGES_MAX=2)
+    def test_images_limit(self):
+        self.client.post(
+            self.url, {"images": self.image_files("red")}, format="multipart"
+        )
+        resp = self.client.post(
+            self.url,
+            {"images": self.image_files("green", "blue")},
+            format="multipart"
+        )
+
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.post.images.count(), 1)
+
+    def test_only_author_adds_images(self):
+        stranger = get_user_model().objects.create_user(
+            email="stranger@test.com",
+            password="testpass"
+        )
+        self.user.followers.add(stranger)
+        self.client.force_authenticate(stranger)
+
+        resp = self.client.post(
+            self.url, {"images": self.image_files("red")}, format="multipart"
+        )
+
+        self.assertIn(
+            resp.status_code,
+            (status.HTTP_403_FORBIDDEN, status.HTTP_404_NOT_FOUND)
+        )
+        self.assertFalse(self.post.images.exists())
+
+
+class ScheduledPublishingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test_user@test.com",
+            password="testpass"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_publish_post_at_publish_time(self):
+        publish_time = timezone.now() + timezone.timedelta(hours=1)
+        payload = {
+            "title": "Scheduled post",
+            "content": "Test post content",
+            "published": False,
+            "publish_time": publish_time,
+            "created_at": timezone.now()
+        }
+
+        with patch("social_network.tasks.publish_post.apply_async") as task:
+            with self.captureOnCommitCallbacks(execute=True):
+                resp = self.client.post(
+                    reverse("social_network:post-list"), payload
+                )
+        task.assert_called_once_with((resp.data["id"],), eta=publish_time)
+
+        post_id = resp.data["id"]
+        post_url = reverse("social_network:post-detail", args=[post_id])
+        with patch("social_network.tasks.publish_post.apply_async") as task:
+            with self.captureOnCommitCallbacks(execute=True):
+                resp = self.client.patch(
+                    post_url,
+                    {"title": "Renamed post", "publish_time": publish_time}
+                )
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        task.assert_not_called()
+
+        self.assertFalse(publish_post(post_id))
+
+        Post.objects.filter(id=post_id).update(publish_time=timezone.now())
+        self.assertTrue(publish_post(post_id))
+        self.assertFalse(publish_post(post_id))
+        self.assertTrue(Post.objects.get(id=post_id).published)
+
+    @override_settings(
+        CELERY_BROKER_TRANSPORT_OPTIONS={"visibility_timeout": 60 * 60}
+    )
+    def test_far_publish_time_left_to_sweeper(self):
+        publish_time = timezone.now() + timezone.timedelta(days=1)
+        payload = {
+            "title": "Scheduled post",
+            "content": "Test post content",
+            "published": False,
+            "publish_time": publish_time,
+            "created_at": timezone.now()
+        }
+
+        with patch("social_network.tasks.publish_post.apply_async") as task:
+            with self.captureOnCommitCallbacks(execute=True):
+                resp = self.client.post(
+                    reverse("social_network:post-list"), payload
+                )
+        task.assert_not_called()
+
+        publish_time = timezone.now() + timezone.timedelta(minutes=5)
+        Post.objects.filter(id=resp.data["id"]).update(
+            publish_time=publish_time
+        )
+        with patch("social_network.tasks.publish_post.apply_async") as task:
+            publish_posts()
+        task.assert_called_once_with((resp.data["id"],), eta=publish_time)
+
+
+class ReconcileCountersTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_reconcile_counters(self):
+        author = get_user_model().objects.create_user(
+            email="test_user@test.com",
+            password="testpass"
+        )
+        reader = get_user_model().objects.create_user(
+            email="john_simmons@test.com",
+            password="testpass"
+        )
+        post = Post.objects.create(
+            author=author,
+            title="Test post",
+            content="Test post content",
+            like_count=10
+        )
+        post.likes.add(reader)
+        Comment.objects.create(author=reader, post=post, content="Comment")
+        author.followers.add(reader)
+        reader.followings.add(author)
+        hashtag = Hashtag.objects.create(name="economy", post_count=3)
+        post.hashtags.add(hashtag)
+
+        call_command("reconcile_counters", batch_size=1, stdout=StringIO())
+
+        post.refresh_from_db()
+        author.refresh_from_db()
+        reader.refresh_from_db()
+        self.assertEqual((post.like_count, post.comment_count), (1, 1))
+        self.assertEqual((author.follower_count, author.post_count), (1, 1))
+        self.assertEqual(reader.following_count, 1)
+        hashtag.refresh_from_db()
+        self.assertEqual(hashtag.post_count, 1)
+
+
+class HashtagApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test_user@test.com",
+            password="testpass"
+        )
+        self.client.force_authenticate(self.user)
+
+    def create_post(self, *hashtags):
+        payload = {
+            "title": "Test post",
+            "content": "Test post content",
+            "published": True,
+            "hashtags": [{"name": hashtag} for hashtag in hashtags],
+            "created_at": timezone.now()
+        }
+        resp = self.client.post(
+            reverse("social_network:post-list"), payload, format="json"
+        )
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        return resp.data["id"]
+
+    def test_hashtag_posts_skip_scheduled_posts(self):
+        post_id = self.create_post("#python")
+        hashtag = Hashtag.objects.get(name="python")
+        scheduled_post = Post.objects.create(
+            author=self.user,
+            title="Scheduled post",
+            content="Test post content",
+            published=False,
+            publish_time=timezone.now() + timedelta(days=1)
+        )
+        scheduled_post.hashtags.add(hashtag)
+        url = reverse("social_network:hashtag-detail", args=[hashtag.id])
+
+        resp = self.client.get(url)
+        self.assertEqual(
+            [post["id"] for post in resp.data["posts"]], [post_id]
+        )
+
+        resp = self.client.get(url + "posts/")
+        self.assertEqual(
+            [post["id"] for post in resp.data["results"]], [post_id]
+        )
+
+    def test_trending_hashtags_ranked_by_recent_uses(self):
+        post_id = self.create_post("#python", "#django")
+        self.create_post("#python")
+        self.client.patch(
+            reverse("social_network:post-detail", args=[post_id]),
+            {
+                "published": True,
+                "hashtags": [{"name": "#python"}, {"name": "#celery"}]
+            },
+            format="json"
+        )
+
+        resp = self.client.get(reverse("social_network:hashtag-trending"))
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(hashtag["name"], hashtag["uses"]) for hashtag in resp.data],
+            [("python", 2), ("django", 1), ("celery", 1)]
+        )
+
+    def test_hashtags_are_case_normalized(self):
+        Hashtag.objects.create(name="#Python")
+        post_id = self.create_post("#PYTHON", "python", "#Django")
+
+        self.assertEqual(
+            sorted(Hashtag.objects.values_list("name", flat=True)),
+            ["django", "python"]
+        )
+        self.assertEqual(
+            Post.objects.get(id=post_id).hashtags.count(), 2
+        )
+
+    def test_hashtag_autocomplete(self):
+        self.create_post("#innovations", "#inflation")
+        self.create_post("#inflation", "#economy")
+        post_id = self.create_post("#inflation", "#inbox")
+        self.client.delete(
+            reverse("social_network:post-detail", args=[post_id])
+        )
+        url = reverse("social_network:hashtag-autocomplete")
+
+        resp = self.client.get(url, {"prefix": "#IN"})
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(hashtag["name"], hashtag["posts"]) for hashtag in resp.data],
+            [("#inflation", 2), ("#innovations", 1), ("#inbox", 0)]
+        )
+        self.assertIn("max-age", resp["Cache-Control"])
+
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_prune_hashtag_activity(self):
+        self.create_post("#python")
+        hashtag = Hashtag.objects.get(name="python")
+        HashtagActivity.objects.create(
+            hashtag=hashtag,
+            bucket_start=bucket_start(
+                timezone.now() - timezone.timedelta(days=2)
+            ),
+            count=5
+        )
+
+        self.assertEqual(prune_hashtag_activity(), 1)
+        self.assertEqual(
+            list(HashtagActivity.objects.values_list("count", flat=True)), [1]
+        )
@@ -0,0 +1,166 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from social_network.models import Post, PostImage, Comment, Hashtag
+
+
+class ListQueryCountTests(TestCase):
+    """Every list endpoint must cost the same number of queries whatever
+    the page size, i.e. serializers may not query per row.
+    """
+
+    page_sizes = (1, 5)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test_user@test.com",
+            password="testpass",
+            first_name="Test",
+            last_name="User"
+        )
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}"
+        )
+
+        self.hashtag = Hashtag.objects.create(name="economy")
+        self.post = None
+        for i in range(5):
+            author = get_user_model().objects.create_user(
+                email=f"author_{i}@test.com",
+                password="testpass",
+                last_name=f"Author {i}"
+            )
+            author.followings.add(self.user)
+            author.followers.add(self.user)
+            self.user.followings.add(author)
+            self.user.followers.add(author)
+
+            post = Post.objects.create(
+                author=author,
+                title=f"Test post {i}",
+                content="Test post content"
+            )
+            post.hashtags.add(self.hashtag)
+            post.likes.add(self.user, author)
+            for position in range(2):
+                PostImage.objects.create(
+                    post=post,
+                    image=f"uploads/posts/post-{i}-{position}.jpg",
+                    position=position
+                )
+            Comment.objects.create(
+                author=author, post=post, content="Test comment"
+            )
+            self.post = self.post or post
+
+    def assertConstantQueries(self, url, params=None):
+        # Warm up caches so that only per-request queries are compared.
+        self.client.get(url, params)
+
+        query_counts = []
+        for page_size in self.page_sizes:
+            with CaptureQueriesContext(connection) as queries:
+                resp = self.client.get(
+                    url, {**(params or {}), "page_size": page_size}
+                )
+
+            self.assertEqual(resp.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(resp.data["results"]), page_size)
+            query_counts.append(len(queries))
+
+        self.assertEqual(len(set(query_counts)), 1, query_counts)
+
+    def user_url(self, action):
+        return (
+            reverse("social_network:user-detail", args=[self.user.id])
+            + f"{action}/"
+        )
+
+    def test_post_list(self):
+        self.assertConstantQueries(reverse("social_network:post-list"))
+
+    def test_user_list(self):
+        self.assertConstantQueries(reverse("social_network:user-list"))
+
+    def test_user_followers(self):
+        self.assertConstantQueries(self.user_url("followers"))
+
+    def test_user_followings(self):
+        self.assertConstantQueries(self.user_url("followings"))
+
+    def test_user_liked_posts(self):
+        self.assertConstantQueries(self.user_url("liked-posts"))
+
+    def test_hashtag_list(self):
+        for i in range(4):
+            Hashtag.objects.create(name=f"hashtag_{i}")
+
+        self.assertConstantQueries(reverse("social_network:hashtag-list"))
+
+    def test_hashtag_posts(self):
+        self.assertConstantQueries(
+            reverse("social_network:hashtag-detail", args=[self.hashtag.id])
+            + "posts/"
+        )
+
+    def test_comment_list(self):
+        for i in range(4):
+            Comment.objects.create(
+                author=self.user, post=self.post, content=f"Comment #{i}"
+            )
+
+        self.assertConstantQueries(
+            reverse("social_network:comment-list"), {"post_id": self.post.id}
+        )
+
+
+class PostCreateQueryCountTests(TestCase):
+    """Creating a post costs the same number of queries however many
+    hashtags are attached to it.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test_user@test.com",
+            password="testpass"
+        )
+        self.client.force_authenticate(self.user)
+
+    def create_post(self, hashtags):
+        payload = {
+            "title": "Test post",
+            "content": "Test post content",
+            "published": True,
+            "hashtags": [{"name": name} for name in hashtags],
+            "created_at": timezone.now()
+        }
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.post(
+                reverse("social_network:post-list"), payload, format="json"
+            )
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        return len(queries)
+
+    def test_create_post_with_hashtags(self):
+        Hashtag.objects.create(name="existing")
+
+        self.assertEqual(
+            self.create_post(["#existing", "#new_1"]),
+            self.create_post(
+                ["#existing", "#new_2", "#new_3", "#new_4", "#new_5"]
+            )
+        )
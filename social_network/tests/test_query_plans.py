@@ -0,0 +1,157 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from social_network.models import Post, Comment, Hashtag
+
+
+class QueryPlanTests(TestCase):
+    """Hot API paths must be answerable from indexes.
+
+    Every SELECT an endpoint runs is EXPLAINed with sequential scans
+    disabled, so the planner only falls back to one when no index can
+    serve the query, however small the seeded tables are.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test_user@test.com",
+            password="testpass",
+            last_name="User"
+        )
+        self.client.force_authenticate(self.user)
+
+        self.hashtag = Hashtag.objects.create(name="economy")
+        for i in range(3):
+            author = get_user_model().objects.create_user(
+                email=f"author_{i}@test.com",
+                password="testpass",
+                last_name=f"Author {i}"
+            )
+            self.user.followings.add(author)
+            post = Post.objects.create(
+                author=author,
+                title=f"Test post {i}",
+                content="Test post content"
+            )
+            post.hashtags.add(self.hashtag)
+            post.likes.add(self.user)
+            Comment.objects.create(
+                author=self.user, post=post, content="Test comment"
+            )
+            self.post = post
+
+        Post.objects.create(
+            author=self.user,
+            title="Scheduled post",
+            content="Test post content",
+            published=False,
+            publish_time=timezone.now() + timedelta(days=1)
+        )
+
+        # Skew the tables like production data, where the rows a hot path
+        # needs are few, so the planner statistics favour selective indexes.
+        stranger = get_user_model().objects.create_user(
+            email="stranger@test.com",
+            password="testpass"
+        )
+        other_post = Post.objects.create(
+            author=stranger, title="Other post", content="Test post content"
+        )
+        Post.objects.bulk_create(
+            Post(author=stranger, title=f"Post {i}", content="Content")
+            for i in range(500)
+        )
+        Comment.objects.bulk_create(
+            Comment(author=stranger, post=other_post, content="Comment")
+            for i in range(500)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "ANALYZE social_network_post, social_network_comment"
+            )
+
+    def explain(self, sql: str, params=None) -> str:
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute(f"EXPLAIN {sql}", params)
+            return "\n".join(row[0] for row in cursor.fetchall())
+
+    def assertIndexedPlans(self, plans, indexes):
+        for sql, plan in plans:
+            self.assertNotIn("Seq Scan", plan, f"{sql}\n{plan}")
+
+        # Any index would do once sequential scans are off, so the indexes
+        # meant for the query shape are checked by name.
+        all_plans = "\n".join(plan for _, plan in plans)
+        for index in indexes:
+            self.assertIn(index, all_plans)
+
+    def assertIndexedQueries(self, url, params=None, indexes=()):
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(url, params)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+        self.assertIndexedPlans(
+            [
+                (query["sql"], self.explain(query["sql"]))
+                for query in queries
+                if query["sql"].startswith("SELECT")
+            ],
+            indexes
+        )
+
+    def assertIndexedQueryset(self, queryset, indexes=()):
+        sql, params = queryset.query.sql_with_params()
+        self.assertIndexedPlans([(sql, self.explain(sql, params))], indexes)
+
+    def user_url(self, action):
+        return reverse(
+            "social_network:user-detail", args=[self.user.id]
+        ) + f"{action}/"
+
+    def test_post_list(self):
+        self.assertIndexedQueries(reverse("social_network:post-list"))
+
+    def test_post_detail(self):
+        self.assertIndexedQueries(
+            reverse("social_network:post-detail", args=[self.post.id])
+        )
+
+    def test_user_published_posts(self):
+        self.assertIndexedQueries(self.user_url("published-posts"))
+
+    def test_user_followings(self):
+        self.assertIndexedQueries(self.user_url("followings"))
+
+    def test_hashtag_posts(self):
+        self.assertIndexedQueries(
+            reverse("social_network:hashtag-detail", args=[self.hashtag.id])
+            + "posts/"
+        )
+
+    def test_comment_list(self):
+        self.assertIndexedQueries(
+            reverse("social_network:comment-list"),
+            {"post_id": self.post.id},
+            indexes=["comment_post_created_idx"]
+        )
+
+    def test_scheduled_posts(self):
+        self.assertIndexedQueryset(
+            Post.objects.filter(
+                published=False, publish_time__lte=timezone.now()
+            ),
+            indexes=["post_scheduled_idx"]
+        )
@@ -0,0 +1,59 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from social_network.models import Post
+from social_network.throttling import ScopedRateThrottle, take
+
+
+class ThrottlingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test_user@test.com",
+            password="testpass"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_take_allows_burst_then_steady_rate(self):
+        with patch("social_network.throttling.time", return_value=1000):
+            self.assertEqual(
+                [take("throttle_test", 3, 60) for _ in range(3)], [0, 0, 0]
+            )
+            self.assertEqual(take("throttle_test", 3, 60), 20)
+
+        with patch("social_network.throttling.time", return_value=1020):
+            self.assertEqual(take("throttle_test", 3, 60), 0)
+            self.assertEqual(take("throttle_test", 3, 60), 20)
+
+    def test_scoped_throttle_on_like(self):
+        post = Post.objects.create(
+            author=self.user, title="Test post", content="Test post content"
+        )
+        url = reverse("social_network:post-detail", args=[post.id])
+
+        with patch.object(
+            ScopedRateThrottle, "THROTTLE_RATES", {"like": "2/min"}
+        ):
+            statuses = [
+                self.client.post(url + "like-unlike/").status_code
+                for _ in range(3)
+            ]
+            resp = self.client.get(url)
+
+        self.assertEqual(
+            statuses,
+            [
+                status.HTTP_200_OK,
+                status.HTTP_200_OK,
+                status.HTTP_429_TOO_MANY_REQUESTS
+            ]
+        )
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
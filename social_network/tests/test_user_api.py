@@ -1,21 +1,39 @@
 import tempfile
+from io import BytesIO
 
 from PIL import Image
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.text import slugify
+from drf_spectacular.generators import SchemaGenerator
 
 from rest_framework import status
 from rest_framework.test import APIClient
 from rest_framework_simplejwt.tokens import RefreshToken
 
-from social_network.models import Post, user_image_file_path
+from social_network import graph
+from social_network.counters import get_counters, reconcile
+from social_network.suggestions import refresh_suggestions
+from social_network.models import (
+    Comment,
+    Follow,
+    Hashtag,
+    Post,
+    user_image_file_path,
+)
 from social_network.serializers import UserSerializer, PostSerializer
 
 
 class UnauthenticatedUserApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
     def test_auth_required(self):
         self.client = APIClient()
         self.user = get_user_model().objects.create_user(
@@ -45,6 +63,7 @@ class UnauthenticatedUserApiTests(TestCase):
 
 class AuthenticatedUserApiTests(TestCase):
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.user = get_user_model().objects.create_user(
             email="greta_grundig@test.com",
@@ -67,7 +86,35 @@ class AuthenticatedUserApiTests(TestCase):
             reverse("social_network:user-list"),
             {"last_name": target_user.last_name}
         )
-        self.assertIn(resp.data[0]["last_name"], target_user.last_name)
+        self.assertIn(
+            resp.data["results"][0]["last_name"], target_user.last_name
+        )
+
+    def test_fuzzy_search_users(self):
+        simmons = get_user_model().objects.create_user(
+            email="john_simmons@test.com",
+            password="testpass",
+            first_name="John",
+            last_name="Simmons"
+        )
+        simpson = get_user_model().objects.create_user(
+            email="homer@springfield.com",
+            password="testpass",
+            first_name="Homer",
+            last_name="Simpson"
+        )
+        url = reverse("social_network:user-list")
+
+        for query in ("simm", "Simmnos", "john_simmons@test"):
+            resp = self.client.get(url, {"q": query})
+            self.assertEqual(resp.status_code, status.HTTP_200_OK)
+            self.assertEqual(resp.data["results"][0]["id"], simmons.id)
+
+        resp = self.client.get(url, {"q": "sim"})
+        self.assertEqual(
+            {user["id"] for user in resp.data["results"]},
+            {simmons.id, simpson.id}
+        )
 
     def test_add_user_to_following(self):
         followed_user = get_user_model().objects.create_user(
@@ -87,6 +134,36 @@ class AuthenticatedUserApiTests(TestCase):
             self.user.followings.filter(id=followed_user.id).exists()
         )
 
+        self.user.refresh_from_db()
+        followed_user.refresh_from_db()
+        self.assertEqual(self.user.following_count, 1)
+        self.assertEqual(followed_user.follower_count, 1)
+
+    def test_follow_graph_cache_invalidated_on_follow_unfollow(self):
+        followed_user = get_user_model().objects.create_user(
+            email="brigham_young@test.com",
+            password="testpass",
+            first_name="Brigham",
+            last_name="Young"
+        )
+        url = (
+            reverse("social_network:user-detail", args=[followed_user.id])
+            + "follow-unfollow/"
+        )
+        self.assertFalse(graph.is_following(self.user.id, followed_user.id))
+
+        self.client.post(url)
+
+        self.assertTrue(graph.is_following(self.user.id, followed_user.id))
+        self.assertEqual(
+            list(graph.follower_ids(followed_user.id)), [self.user.id]
+        )
+
+        self.client.post(url)
+
+        self.assertFalse(graph.is_following(self.user.id, followed_user.id))
+        self.assertEqual(list(graph.follower_ids(followed_user.id)), [])
+
     def test_remove_user_from_followings(self):
         followed_user = get_user_model().objects.create_user(
             email="bryan_griffin@test.com",
@@ -131,9 +208,62 @@ class AuthenticatedUserApiTests(TestCase):
 
         self.assertEqual(resp.status_code, status.HTTP_200_OK)
 
-        serializer = UserSerializer(self.user.followers.all(), many=True)
+        serializer = UserSerializer(
+            self.user.followers.order_by("-date_joined", "-id"), many=True
+        )
+        self.assertEqual(len(serializer.data), 2)
+
+        self.assertEqual(resp.data["results"], serializer.data)
 
-        self.assertEqual(resp.data, serializer.data)
+    def test_followers_list_not_modified(self):
+        url = (
+            reverse("social_network:user-detail", args=[self.user.id])
+            + "followers/"
+        )
+        etag = self.client.get(url)["ETag"]
+
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        follower = get_user_model().objects.create_user(
+            email="jessica_simmons@test.com",
+            password="testpass",
+            first_name="Jessica",
+            last_name="Simmons"
+        )
+        follower.followings.add(self.user)
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data["results"][0]["id"], follower.id)
+
+    def test_published_posts_list_not_modified(self):
+        url = (
+            reverse("social_network:user-detail", args=[self.user.id])
+            + "published-posts/"
+        )
+        post = Post.objects.create(
+            author=self.user, title="Test post", content="Test post content"
+        )
+        etag = self.client.get(url)["ETag"]
+
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        comment = Comment.objects.create(
+            author=self.user, post=post, content="Test comment"
+        )
+        self.client.patch(
+            reverse("social_network:comment-detail", args=[comment.id]),
+            {"content": "Edited comment"},
+        )
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            resp.data["results"][0]["comments"][0]["content"],
+            "Edited comment"
+        )
 
     def test_liked_posts_list(self):
         bryan_griffin = get_user_model().objects.create_user(
@@ -163,9 +293,11 @@ class AuthenticatedUserApiTests(TestCase):
 
         self.assertEqual(resp.status_code, status.HTTP_200_OK)
 
-        serializer = PostSerializer(self.user.post_like.all(), many=True)
+        serializer = PostSerializer(
+            self.user.post_like.order_by("-created_at", "-id"), many=True
+        )
 
-        self.assertEqual(resp.data, serializer.data)
+        self.assertEqual(resp.data["results"], serializer.data)
 
     def test_upload_image_to_user(self):
         url = (
@@ -187,6 +319,82 @@ class AuthenticatedUserApiTests(TestCase):
 
         self.assertTrue(uploaded_image.file)
 
+    def test_update_user_ignores_image(self):
+        with tempfile.NamedTemporaryFile(suffix=".jpg") as ntf:
+            Image.new("RGB", (10, 10)).save(ntf, format="JPEG")
+            ntf.seek(0)
+            resp = self.client.patch(
+                reverse("social_network:user-detail", args=[self.user.id]),
+                {"image": ntf, "bio": "Test bio"},
+                format="multipart",
+            )
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertNotIn("image", resp.data)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.bio, "Test bio")
+        self.assertFalse(self.user.image)
+
+    def post_upload(self, content, suffix=".jpg"):
+        url = reverse(
+            "social_network:user-upload-image", args=[self.user.id]
+        )
+        with tempfile.NamedTemporaryFile(suffix=suffix) as ntf:
+            ntf.write(content)
+            ntf.seek(0)
+            return self.client.post(url, {"image": ntf}, format="multipart")
+
+    def test_upload_rejects_non_image(self):
+        resp = self.post_upload(b"<?php echo 'not an image'; ?>" * 10)
+
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("image", resp.data)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.image)
+
+    @override_settings(IMAGE_UPLOAD_MAX_BYTES=1024)
+    def test_upload_rejects_oversized_file(self):
+        buffer = BytesIO()
+        Image.effect_noise((100, 100), 64).save(buffer, format="PNG")
+
+        resp = self.post_upload(buffer.getvalue(), suffix=".png")
+
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("1024 bytes", resp.data["image"][0])
+
+    @override_settings(IMAGE_UPLOAD_MAX_MEGAPIXELS=1)
+    def test_upload_rejects_too_many_pixels(self):
+        buffer = BytesIO()
+        Image.new("RGB", (2000, 1000)).save(buffer, format="PNG")
+
+        resp = self.post_upload(buffer.getvalue(), suffix=".png")
+
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("1 megapixels", resp.data["image"][0])
+
+    def test_upload_large_webp(self):
+        buffer = BytesIO()
+        Image.effect_noise((1000, 700), 64).save(buffer, format="WEBP")
+        self.assertGreater(len(buffer.getvalue()), 256 * 1024)
+
+        resp = self.post_upload(buffer.getvalue(), suffix=".webp")
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.image)
+
+    @override_settings(IMAGE_UPLOAD_MAX_MEGAPIXELS=0.5)
+    def test_upload_rejects_webp_with_too_many_pixels(self):
+        buffer = BytesIO()
+        Image.effect_noise((1000, 700), 64).save(
+            buffer, format="WEBP", lossless=True
+        )
+
+        resp = self.post_upload(buffer.getvalue(), suffix=".webp")
+
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("0.5 megapixels", resp.data["image"][0])
+
     def test_user_image_file_path(self):
         filename = "test_image.jpg"
         result_path = user_image_file_path(self.user, filename)
@@ -226,3 +434,177 @@ class AuthenticatedUserApiTests(TestCase):
         )
 
         self.assertEqual(resp.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_delete_user_updates_counters_of_remaining_rows(self):
+        other = get_user_model().objects.create_user(
+            email="other_user@test.com",
+            password="testpass"
+        )
+        Follow.objects.create(follower=self.user, followee=other)
+        Follow.objects.create(follower=other, followee=self.user)
+        post = Post.objects.create(
+            author=other, title="Test post", content="Test post content"
+        )
+        post.likes.add(self.user)
+        Comment.objects.create(
+            author=self.user, post=post, content="Test comment"
+        )
+        hashtag = Hashtag.objects.create(name="economy")
+        own_post = Post.objects.create(
+            author=self.user, title="Own post", content="Test post content"
+        )
+        own_post.hashtags.add(hashtag)
+        counters = get_counters(get_user_model(), Post, Comment)
+        for model, model_counters in counters.items():
+            reconcile(model, model_counters, batch_size=100)
+
+        self.client.delete(
+            reverse("social_network:user-detail", args=[self.user.id]),
+        )
+
+        other.refresh_from_db()
+        post.refresh_from_db()
+        hashtag.refresh_from_db()
+        self.assertEqual(other.follower_count, 0)
+        self.assertEqual(other.following_count, 0)
+        self.assertEqual(post.like_count, 0)
+        self.assertEqual(post.comment_count, 0)
+        self.assertEqual(hashtag.post_count, 0)
+
+
+class CachedAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="test_user@test.com",
+            password="testpass"
+        )
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}"
+        )
+
+    def user_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        return [
+            query for query in queries
+            if 'FROM "social_network_user"' in query["sql"]
+        ]
+
+    def test_user_resolved_from_cache(self):
+        url = reverse("social_network:hashtag-list")
+
+        self.assertEqual(len(self.user_queries(url)), 1)
+        self.assertEqual(self.user_queries(url), [])
+
+    def test_stateless_endpoint_skips_user_lookup(self):
+        url = reverse("social_network:hashtag-trending")
+
+        self.assertEqual(self.user_queries(url), [])
+
+    def test_password_change_revokes_cached_tokens(self):
+        url = reverse("social_network:user-detail", args=[self.user.id])
+        self.client.get(url)
+
+        resp = self.client.patch(url, {"password": "new_password"})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_admin_password_change_revokes_cached_tokens(self):
+        url = reverse("social_network:user-detail", args=[self.user.id])
+        self.client.get(url)
+
+        admin = get_user_model().objects.create_superuser(
+            email="admin@test.com", password="testpass"
+        )
+        admin_client = Client()
+        admin_client.force_login(admin)
+        resp = admin_client.post(
+            reverse("admin:auth_user_password_change", args=[self.user.id]),
+            {"password1": "new_password", "password2": "new_password"},
+        )
+        self.assertEqual(resp.status_code, status.HTTP_302_FOUND)
+
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_schema_documents_jwt_auth(self):
+        schema = SchemaGenerator().get_schema(request=None, public=True)
+
+        self.assertIn("jwtAuth", schema["components"]["securitySchemes"])
+        self.assertIn(
+            {"jwtAuth": []},
+            schema["paths"]["/api/social-network/hashtags/trending/"]["get"][
+                "security"
+            ],
+        )
+
+
+class FollowSuggestionApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user, self.alice, self.bob, self.carol, self.dave = [
+            get_user_model().objects.create_user(
+                email=f"{name}@test.com", password="testpass"
+            )
+            for name in ("greta", "alice", "bob", "carol", "dave")
+        ]
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}"
+        )
+        self.url = (
+            reverse("social_network:user-detail", args=[self.user.id])
+            + "suggestions/"
+        )
+
+        self.user.followings.add(self.alice, self.bob)
+        self.alice.followings.add(self.carol, self.dave, self.user)
+        self.bob.followings.add(self.carol)
+
+    def test_suggestions_ranked_by_mutual_follows(self):
+        refresh_suggestions()
+
+        resp = self.client.get(self.url)
+
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(s["user"]["id"], s["mutual_count"]) for s in resp.data],
+            [(self.carol.id, 2), (self.dave.id, 1)]
+        )
+
+    def test_suggestions_refreshed_for_changed_users_only(self):
+        refresh_suggestions()
+        since = timezone.now()
+
+        self.client.post(
+            reverse("social_network:user-detail", args=[self.carol.id])
+            + "follow-unfollow/"
+        )
+
+        self.assertEqual(refresh_suggestions(since), 2)
+        self.assertEqual(
+            [s["user"]["id"] for s in self.client.get(self.url).data],
+            [self.dave.id]
+        )
+
+    def test_suggestions_of_other_user_forbidden(self):
+        resp = self.client.get(
+            reverse("social_network:user-detail", args=[self.alice.id])
+            + "suggestions/"
+        )
+
+        self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_suggestions_of_invalid_user_id_forbidden(self):
+        resp = self.client.get(
+            reverse("social_network:user-list") + "me/suggestions/"
+        )
+
+        self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,92 @@
+"""Rate throttles sharing their state across all application processes.
+
+Instead of DRF's per-key list of request timestamps, every key holds a
+single "theoretical arrival time" (GCRA): each request pushes it forward by
+duration / num_requests and is refused while it would end up more than
+`duration` ahead of now. That allows bursts of up to num_requests and then
+a steady rate, with O(1) memory per key.
+
+With Redis configured the check-and-update runs as one Lua script, so it is
+atomic across processes and uses the Redis clock. Without Redis it falls
+back to the default cache, which is good enough for a single process.
+"""
+from functools import cache as memoize
+from time import time
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import throttling
+
+GCRA_SCRIPT = """
+redis.replicate_commands()
+local now = redis.call("TIME")
+now = now[1] * 1000 + math.floor(now[2] / 1000)
+local interval = tonumber(ARGV[1])
+local duration = tonumber(ARGV[2])
+
+local tat = math.max(tonumber(redis.call("GET", KEYS[1]) or now), now)
+local wait = tat + interval - duration - now
+if wait > 0 then
+    return wait
+end
+
+redis.call("SET", KEYS[1], tat + interval, "PX", tat + interval - now)
+return 0
+"""
+
+
+@memoize
+def get_gcra_script():
+    client = redis.Redis.from_url(settings.REDIS_URL)
+    return client.register_script(GCRA_SCRIPT)
+
+
+def take(key: str, num_requests: int, duration: int) -> float:
+    """Count a request against the key's rate.
+
+    Returns 0 when the request is allowed, otherwise the number of seconds
+    until it would be.
+    """
+    interval = duration * 1000 // num_requests
+
+    if settings.REDIS_URL:
+        wait = get_gcra_script()(keys=[key], args=[interval, duration * 1000])
+        return wait / 1000
+
+    now = int(time() * 1000)
+    tat = max(cache.get(key, now), now)
+    wait = tat + interval - duration * 1000 - now
+    if wait > 0:
+        return wait / 1000
+
+    cache.set(key, tat + interval, (tat + interval - now) // 1000 + 1)
+    return 0
+
+
+class GCRARateThrottle(throttling.SimpleRateThrottle):
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.remaining_wait = take(self.key, self.num_requests, self.duration)
+        return self.remaining_wait == 0
+
+    def wait(self):
+        return self.remaining_wait
+
+
+class AnonRateThrottle(throttling.AnonRateThrottle, GCRARateThrottle):
+    pass
+
+
+class UserRateThrottle(throttling.UserRateThrottle, GCRARateThrottle):
+    pass
+
+
+class ScopedRateThrottle(throttling.ScopedRateThrottle, GCRARateThrottle):
+    """Throttle by the `throttle_scope` of the view or of the action."""
@@ -0,0 +1,200 @@
+"""Home timelines: fan-out-on-write into the TimelineEntry table, with
+posts of high-follower authors pulled from a per-author cache at read time.
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from social_network import graph
+from social_network.authentication import invalidate_user
+from social_network.models import Post, TimelineEntry, User, Follow
+
+# Newest first, on the timeline entry so reads range-scan its owner index.
+TIMELINE_ORDERING = ("-timeline_created_at", "-timeline_post_id")
+
+
+def feed_posts(user):
+    """Build the feed on the fly: own posts and posts of followed users."""
+    author_ids = [user.id, *graph.followee_ids(user.id)]
+
+    return Post.objects.filter(author_id__in=author_ids, published=True)
+
+
+def recent_posts_key(author_id: int) -> str:
+    return f"feed:recent-posts:{author_id}"
+
+
+def recent_post_ids(author_ids) -> list[int]:
+    """Ids of the latest published posts of each author, cached per author."""
+    keys = {
+        recent_posts_key(author_id): author_id for author_id in author_ids
+    }
+    cached = cache.get_many(keys)
+    missing = [
+        author_id for key, author_id in keys.items() if key not in cached
+    ]
+
+    if missing:
+        loaded = {recent_posts_key(author_id): [] for author_id in missing}
+        rows = Post.objects.filter(
+            author_id__in=missing, published=True
+        ).annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=F("author_id"),
+                order_by=[F("created_at").desc(), F("id").desc()],
+            )
+        ).filter(
+            position__lte=settings.FEED_RECENT_POSTS_SIZE
+        ).values_list("author_id", "id")
+
+        for author_id, post_id in rows:
+            loaded[recent_posts_key(author_id)].append(post_id)
+
+        cache.set_many(loaded)
+        cached.update(loaded)
+
+    return [post_id for post_ids in cached.values() for post_id in post_ids]
+
+
+def timeline_posts(user):
+    """Read the feed from the user's materialized timeline, merged with the
+    recent posts of followed authors that are not fanned out.
+
+    Posts are annotated with the fields of `TIMELINE_ORDERING`.
+    """
+    followee_ids = graph.followee_ids(user.id)
+    pulled_author_ids = []
+    if followee_ids:
+        pulled_author_ids = list(
+            User.objects.filter(
+                id__in=followee_ids, skip_fan_out=True
+            ).values_list("id", flat=True)
+        )
+
+    if not pulled_author_ids:
+        return Post.objects.filter(timeline_entries__owner=user).annotate(
+            timeline_created_at=F("timeline_entries__created_at"),
+            timeline_post_id=F("timeline_entries__post_id"),
+        )
+
+    return Post.objects.filter(
+        Q(id__in=TimelineEntry.objects.filter(owner=user).values("post_id"))
+        | Q(id__in=recent_post_ids(pulled_author_ids))
+    ).filter(published=True).annotate(
+        timeline_created_at=F("created_at"), timeline_post_id=F("id")
+    )
+
+
+def trim_timelines(owner_ids) -> None:
+    """Drop entries beyond `TIMELINE_DEPTH` from the given timelines.
+
+    Only timelines holding more entries than that are ranked.
+    """
+    overflowing_ids = list(
+        TimelineEntry.objects.filter(owner_id__in=owner_ids).values(
+            "owner_id"
+        ).annotate(
+            entry_count=Count("id")
+        ).filter(
+            entry_count__gt=settings.TIMELINE_DEPTH
+        ).values_list("owner_id", flat=True)
+    )
+    if not overflowing_ids:
+        return
+
+    overflow = TimelineEntry.objects.filter(
+        owner_id__in=overflowing_ids
+    ).annotate(
+        position=Window(
+            RowNumber(),
+            partition_by=F("owner_id"),
+            order_by=[F("created_at").desc(), F("post_id").desc()],
+        )
+    ).filter(position__gt=settings.TIMELINE_DEPTH).values("id")
+
+    TimelineEntry.objects.filter(id__in=overflow).delete()
+
+
+def push_posts(owner_ids, posts) -> None:
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(
+                owner_id=owner_id, post_id=post.id, created_at=post.created_at
+            )
+            for owner_id in owner_ids
+            for post in posts
+        ],
+        ignore_conflicts=True,
+    )
+    trim_timelines(owner_ids)
+
+
+def fan_out_post(post) -> None:
+    """Insert a published post into its author's and followers' timelines.
+
+    Authors above `FEED_FAN_OUT_FOLLOWER_LIMIT` only get the post in their
+    own timeline; followers pick it up from the recent-posts cache.
+    """
+    author = post.author
+    skip_fan_out = (
+        author.follower_count > settings.FEED_FAN_OUT_FOLLOWER_LIMIT
+    )
+    posts = [post]
+
+    if skip_fan_out != author.skip_fan_out:
+        User.objects.filter(id=author.id).update(skip_fan_out=skip_fan_out)
+        if not skip_fan_out:
+            # Posts served from the cache so far must now be pushed as well.
+            posts = author.posts.filter(published=True).order_by(
+                "-created_at", "-id"
+            )[:settings.FEED_RECENT_POSTS_SIZE]
+
+    cache.delete(recent_posts_key(author.id))
+    push_posts([author.id], [post])
+
+    if skip_fan_out:
+        return
+
+    batch_size = settings.TIMELINE_FAN_OUT_BATCH_SIZE
+    follower_ids = Follow.objects.filter(followee=author).values_list(
+        "follower_id", flat=True
+    ).iterator(chunk_size=batch_size)
+
+    while batch := list(islice(follower_ids, batch_size)):
+        push_posts(batch, posts)
+
+
+def remove_post(post) -> None:
+    TimelineEntry.objects.filter(post=post).delete()
+    cache.delete(recent_posts_key(post.author_id))
+
+
+def rebuild_timeline(user) -> None:
+    """Fill the user's timeline from the on-the-fly feed and mark it warm."""
+    posts = feed_posts(user).order_by(
+        "-created_at", "-id"
+    )[:settings.TIMELINE_DEPTH]
+
+    push_posts([user.id], posts)
+    User.objects.filter(id=user.id).update(timeline_built_at=timezone.now())
+    invalidate_user(user.id)
+
+
+def follow_author(user, author) -> None:
+    """Backfill recent posts of a newly followed author."""
+    if user.timeline_built_at is None or author.skip_fan_out:
+        return
+
+    posts = author.posts.filter(published=True).order_by(
+        "-created_at", "-id"
+    )[:settings.TIMELINE_DEPTH]
+    push_posts([user.id], posts)
+
+
+def unfollow_author(user, author) -> None:
+    TimelineEntry.objects.filter(owner=user, post__author=author).delete()
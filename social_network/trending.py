@@ -0,0 +1,92 @@
+"""Trending hashtags counted in fixed-size time buckets.
+
+Every time a hashtag is attached to a post, the counter of the current
+bucket is incremented with a single upsert. The ranking sums the buckets of
+the trending window, so reading it touches at most window / bucket rows per
+hashtag instead of scanning posts; buckets falling out of the window are
+pruned by a periodic task.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Sum
+from django.utils import timezone
+
+from social_network.models import HashtagActivity
+
+TRENDING_CACHE_KEY = "trending-hashtags"
+
+
+def bucket_start(moment):
+    """Start of the bucket the given moment falls into."""
+    bucket = int(settings.TRENDING_HASHTAGS_BUCKET.total_seconds())
+    timestamp = int(moment.timestamp())
+    return moment.fromtimestamp(timestamp - timestamp % bucket, moment.tzinfo)
+
+
+def record_usage(hashtag_ids) -> None:
+    """Count one use of each hashtag in the current bucket."""
+    hashtag_ids = sorted(set(hashtag_ids))
+    if not hashtag_ids:
+        return
+
+    table = HashtagActivity._meta.db_table
+    values = ", ".join(["(%s, %s, 1)"] * len(hashtag_ids))
+    params = []
+    bucket = bucket_start(timezone.now())
+    for hashtag_id in hashtag_ids:
+        params += [hashtag_id, bucket]
+
+    # Ids are sorted so that concurrent upserts lock rows in the same order.
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (hashtag_id, bucket_start, count) "
+            f"VALUES {values} "
+            f"ON CONFLICT (hashtag_id, bucket_start) "
+            f"DO UPDATE SET count = {table}.count + EXCLUDED.count",
+            params,
+        )
+
+
+def window_start():
+    return bucket_start(timezone.now() - settings.TRENDING_HASHTAGS_WINDOW)
+
+
+def trending_hashtags() -> list:
+    """Most used hashtags of the trending window as id, name and uses.
+
+    The ranking is cached briefly since it changes with every post.
+    """
+    ranking = cache.get(TRENDING_CACHE_KEY)
+    if ranking is None:
+        ranking = list(
+            HashtagActivity.objects.filter(bucket_start__gte=window_start())
+            .values("hashtag_id")
+            .annotate(uses=Sum("count"))
+            .order_by("-uses", "hashtag_id")
+            .values("hashtag_id", "hashtag__name", "uses")[
+                : settings.TRENDING_HASHTAGS_SIZE
+            ]
+        )
+        cache.set(
+            TRENDING_CACHE_KEY,
+            ranking,
+            settings.TRENDING_HASHTAGS_CACHE_TIMEOUT,
+        )
+
+    return [
+        {
+            "id": row["hashtag_id"],
+            "name": row["hashtag__name"],
+            "uses": row["uses"],
+        }
+        for row in ranking
+    ]
+
+
+def prune_activity() -> int:
+    """Delete buckets older than the window; returns how many went."""
+    deleted, _ = HashtagActivity.objects.filter(
+        bucket_start__lt=window_start()
+    ).delete()
+    return deleted
@@ -0,0 +1,195 @@
+"""Image uploads checked while they stream in.
+
+`ImageUploadParser` parses multipart requests with a single upload handler
+that spools every file to a temporary file chunk by chunk, so an upload
+never sits in memory as a whole. Before a file is written past its header
+the handler identifies the format from its magic bytes and reads the
+dimensions the header declares; files that are not an allowed image
+format, declare more pixels than allowed or grow beyond the byte cap are
+dropped, and the rest of their body is skipped without being stored.
+"""
+import struct
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadhandler import (
+    SkipFile,
+    TemporaryFileUploadHandler,
+)
+from django.http.multipartparser import (
+    MultiPartParser as DjangoMultiPartParser,
+    MultiPartParserError,
+)
+from PIL import Image
+from rest_framework.exceptions import ParseError, ValidationError
+from rest_framework.parsers import DataAndFiles, MultiPartParser
+
+# Leading bytes the magic number of every supported format fits in.
+MAGIC_BYTES = 16
+# Bytes of a file read while looking for a header declaring its size.
+HEADER_MAX_BYTES = 256 * 1024
+# RIFF header plus the part of the first chunk holding the dimensions.
+WEBP_HEADER_BYTES = 30
+
+
+def has_image_magic(prefix: bytes) -> bool:
+    """Whether the bytes start like a file of an allowed image format."""
+    Image.init()
+    return any(
+        Image.OPEN[image_format][1](prefix)
+        for image_format in settings.IMAGE_UPLOAD_FORMATS
+    )
+
+
+def webp_size(header: bytes):
+    """Dimensions declared by the first chunk of a WebP file.
+
+    Pillow only opens complete WebP files, so the VP8, VP8L or VP8X chunk
+    header is read directly. Returns None until enough of it has arrived
+    and raises ValueError for a chunk no WebP file starts with.
+    """
+    if len(header) < WEBP_HEADER_BYTES:
+        return None
+
+    chunk, data = header[12:16], header[20:WEBP_HEADER_BYTES]
+    if chunk == b"VP8 " and data[3:6] == b"\x9d\x01\x2a":
+        width, height = struct.unpack("<HH", data[6:10])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and data[0] == 0x2F:
+        bits = int.from_bytes(data[1:5], "little")
+        return (bits & 0x3FFF) + 1, (bits >> 14 & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        return (
+            int.from_bytes(data[4:7], "little") + 1,
+            int.from_bytes(data[7:10], "little") + 1,
+        )
+    raise ValueError("Not a WebP chunk header")
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.errors = {}
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.header = b""
+        self.identified = False
+
+        if (
+            self.content_length is not None
+            and self.content_length > settings.IMAGE_UPLOAD_MAX_BYTES
+        ):
+            self.reject(self.size_error())
+            raise SkipFile
+
+    def receive_data_chunk(self, raw_data, start):
+        error = None
+        if start + len(raw_data) > settings.IMAGE_UPLOAD_MAX_BYTES:
+            error = self.size_error()
+        elif not self.identified:
+            self.header += raw_data
+            error = self.check_header()
+
+        if error:
+            self.reject(error)
+            raise SkipFile
+
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        error = None if self.identified else self.check_header(complete=True)
+        if error:
+            self.reject(error)
+            return None
+
+        return super().file_complete(file_size)
+
+    def check_header(self, complete=False):
+        """Identify the image once enough of its header has arrived.
+
+        Returns an error message for a file that is no acceptable image.
+        """
+        if len(self.header) >= MAGIC_BYTES and not has_image_magic(
+            self.header[:MAGIC_BYTES]
+        ):
+            return self.format_error()
+
+        size = None
+        if self.header[:4] == b"RIFF" and self.header[8:12] == b"WEBP":
+            try:
+                size = webp_size(self.header)
+            except ValueError:
+                return self.format_error()
+            if size is None and not complete:
+                return None
+
+        if size is None:
+            try:
+                with Image.open(
+                    BytesIO(self.header),
+                    formats=settings.IMAGE_UPLOAD_FORMATS,
+                ) as image:
+                    size = image.size
+            except Image.DecompressionBombError:
+                return self.pixels_error()
+            except OSError:
+                # Unidentified until the header is complete.
+                if complete or len(self.header) >= HEADER_MAX_BYTES:
+                    return self.format_error()
+                return None
+
+        width, height = size
+        self.identified = True
+        self.header = b""
+        if width * height > settings.IMAGE_UPLOAD_MAX_MEGAPIXELS * 10 ** 6:
+            return self.pixels_error()
+        return None
+
+    def reject(self, message):
+        """Record the error of the current file and drop what was spooled."""
+        self.errors[self.field_name] = [message]
+        self.file.close()
+
+    @staticmethod
+    def format_error() -> str:
+        return "Upload a valid image. Supported formats: {}.".format(
+            ", ".join(settings.IMAGE_UPLOAD_FORMATS)
+        )
+
+    @staticmethod
+    def size_error() -> str:
+        return (
+            f"Ensure the image is at most "
+            f"{settings.IMAGE_UPLOAD_MAX_BYTES} bytes."
+        )
+
+    @staticmethod
+    def pixels_error() -> str:
+        return (
+            f"Ensure the image has at most "
+            f"{settings.IMAGE_UPLOAD_MAX_MEGAPIXELS} megapixels."
+        )
+
+
+class ImageUploadParser(MultiPartParser):
+    """Multipart parser refusing oversized or invalid images up front."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        request = parser_context["request"]
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        meta = request.META.copy()
+        meta["CONTENT_TYPE"] = media_type
+        handler = ImageUploadHandler(request)
+
+        try:
+            parser = DjangoMultiPartParser(meta, stream, [handler], encoding)
+            data, files = parser.parse()
+        except MultiPartParserError as exc:
+            raise ParseError(f"Multipart form parse error - {exc}")
+
+        if handler.errors:
+            raise ValidationError(handler.errors)
+
+        return DataAndFiles(data, files)
@@ -1,7 +1,6 @@
 from django.urls import path, include
 from rest_framework import routers
 from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
     TokenRefreshView,
     TokenVerifyView,
 )
@@ -9,6 +8,7 @@ from rest_framework_simplejwt.views import (
 from social_network.views import (
     UserViewSet,
     CreateUserView,
+    LoginView,
     PostViewSet,
     CommentViewSet,
     HashtagViewSet,
@@ -32,7 +32,7 @@ urlpatterns = [
     ),
     path(
         "users/login/",
-        TokenObtainPairView.as_view(),
+        LoginView.as_view(),
         name="token-obtain-pair"
     ),
     path(
@@ -1,35 +1,112 @@
-from django.db.models import Q
+from celery import group
+from django.conf import settings
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, OuterRef, Q, Subquery
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from rest_framework import generics, status, mixins, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import (
+    NotFound,
+    PermissionDenied,
+    ValidationError,
+)
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet, ModelViewSet
-from rest_framework_simplejwt.authentication import JWTAuthentication
-
-from social_network.models import User, Post, Comment, Hashtag
+from rest_framework_simplejwt.views import TokenObtainPairView
+
+from social_network import (
+    graph,
+    images,
+    media,
+    post_cache,
+    timeline,
+    trending,
+)
+from social_network.authentication import (
+    CachedJWTAuthentication,
+    StatelessJWTAuthentication,
+    invalidate_user,
+)
+from social_network.conditional import ConditionalListMixin
+from social_network.counters import get_counters, recount
+from social_network.models import (
+    User,
+    Post,
+    PostImage,
+    Comment,
+    Hashtag,
+    Follow,
+    normalize_hashtag,
+)
 from social_network.permissions import IsAuthorOrIfAuthenticatedReadOnly
 from social_network.serializers import (
     UserSerializer,
     UserListSerializer,
     UserImageSerializer,
+    FollowSuggestionSerializer,
     PostSerializer,
     PostListSerializer,
     PostDetailSerializer,
     PostImageSerializer,
+    PostImageUploadSerializer,
+    PostImagesUploadSerializer,
     CommentSerializer,
     HashtagSerializer,
     HashtagListSerializer,
     HashtagDetailSerializer,
+    TrendingHashtagSerializer,
+)
+from social_network.tasks import (
+    fan_out_post,
+    rebuild_timeline,
+    render_image_variants,
+    schedule_publishing,
 )
+from social_network.uploads import ImageUploadParser
 
 
 class CreateUserView(generics.CreateAPIView):
     serializer_class = UserSerializer
 
 
+# Columns of a post changing with everything post serializers show.
+# Attaching hashtags or images and editing comments bump `updated_at`;
+# the hashtag names catch renames.
+POST_ETAG_FIELDS = (
+    "id",
+    "title",
+    "content",
+    "image_variants",
+    "published",
+    "publish_time",
+    "like_count",
+    "comment_count",
+    "updated_at",
+    Subquery(
+        Post.hashtags.through.objects.filter(post_id=OuterRef("pk"))
+        .order_by()
+        .values("post_id")
+        .annotate(names=ArrayAgg("hashtag__name", order_by="hashtag__name"))
+        .values("names")
+    ),
+)
+# Post list pages also show the author's last name and the like status.
+POST_LIST_ETAG_FIELDS = POST_ETAG_FIELDS + ("author__last_name", "is_liked")
+
+
+class LoginView(TokenObtainPairView):
+    throttle_scope = "login"
+
+
 class UserViewSet(
+    ConditionalListMixin,
     mixins.RetrieveModelMixin,
     mixins.ListModelMixin,
     mixins.UpdateModelMixin,
@@ -37,9 +114,21 @@ class UserViewSet(
     GenericViewSet,
 ):
     serializer_class = UserSerializer
-    authentication_classes = (JWTAuthentication,)
+    authentication_classes = (CachedJWTAuthentication,)
     permission_classes = (IsAuthorOrIfAuthenticatedReadOnly,)
     queryset = User.objects.all()
+    throttle_scope = None
+    list_etag_fields = (
+        "id",
+        "email",
+        "first_name",
+        "last_name",
+        "bio",
+        "image_variants",
+        "post_count",
+        "follower_count",
+        "following_count",
+    )
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -50,30 +139,99 @@ class UserViewSet(
 
     def get_queryset(self):
         last_name = self.request.query_params.get("last_name")
+        search = self.request.query_params.get("q")
 
-        queryset = self.queryset
+        if search:
+            queryset = self.queryset.search(search).order_by(
+                "-similarity", "-id"
+            )
+        else:
+            queryset = self.queryset.order_by("-date_joined", "-id")
 
         if last_name:
             queryset = queryset.filter(last_name__icontains=last_name)
 
         return queryset
 
+    def perform_destroy(self, instance):
+        invalidate_user(instance.id)
+        with transaction.atomic():
+            released = images.file_names(instance)
+            for post in instance.posts.only("image", "image_variants"):
+                released += images.file_names(post)
+            for post_image in PostImage.objects.filter(post__author=instance):
+                released += images.file_names(post_image)
+
+            # Counters of rows the cascade leaves behind.
+            edges = list(
+                Follow.objects.filter(
+                    Q(follower=instance) | Q(followee=instance)
+                ).values_list("follower_id", "followee_id")
+            )
+            post_ids = set(
+                instance.post_like.values_list("id", flat=True)
+            ) | set(
+                instance.comments.values_list("post_id", flat=True)
+            )
+            hashtag_ids = set(
+                Post.hashtags.through.objects.filter(
+                    post__author=instance
+                ).values_list("hashtag_id", flat=True)
+            )
+
+            instance.delete()
+            media.release(released)
+
+            counters = get_counters(User, Post, Comment)
+            user_ids = {user_id for edge in edges for user_id in edge}
+            recount(User, counters[User], user_ids)
+            recount(Post, counters[Post], post_ids)
+            recount(Hashtag, counters[Hashtag], hashtag_ids)
+
+            for follower_id, followee_id in edges:
+                graph.invalidate(follower_id, followee_id)
+            for user_id in user_ids:
+                invalidate_user(user_id)
+            for post_id in post_ids:
+                post_cache.invalidate(post_id)
+
     @action(
         methods=["POST"],
         detail=True,
         url_path="follow-unfollow",
         permission_classes=[IsAuthenticated],
+        throttle_scope="follow",
     )
     def follow_unfollow(self, request, pk=None):
         """Endpoint for following/unfollowing certain user."""
         following = self.get_object()
         follower = self.request.user
-        if following not in follower.followings.all():
-            follower.followings.add(following)
-            following.followers.add(follower)
-        else:
-            follower.followings.remove(following)
-            following.followers.remove(follower)
+
+        with transaction.atomic():
+            unfollowed, _ = Follow.objects.filter(
+                follower=follower, followee=following
+            ).delete()
+            if unfollowed:
+                delta = -1
+            else:
+                _, followed = Follow.objects.get_or_create(
+                    follower=follower, followee=following
+                )
+                delta = int(followed)
+
+            User.objects.filter(id=follower.id).update(
+                following_count=F("following_count") + delta,
+                follows_changed_at=timezone.now(),
+            )
+            User.objects.filter(id=following.id).update(
+                follower_count=F("follower_count") + delta
+            )
+            graph.invalidate(follower.id, following.id)
+
+        if delta > 0:
+            timeline.follow_author(follower, following)
+        elif delta < 0:
+            timeline.unfollow_author(follower, following)
 
         return Response(status=status.HTTP_200_OK)
 
@@ -86,11 +244,11 @@ class UserViewSet(
     def followings(self, request, pk):
         """Endpoint to retrieve followings of certain user."""
         user = User.objects.get(id=pk)
-        followings = user.followings.all()
+        followings = user.followings.prefetch_related(
+            "followers", "followings"
+        ).order_by("-date_joined", "-id")
 
-        serializer = UserSerializer(followings, many=True)
-
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return self.conditional_list(followings, UserSerializer)
 
     @action(
         methods=["GET"],
@@ -101,11 +259,11 @@ class UserViewSet(
     def followers(self, request, pk):
         """Endpoint to retrieve followers of certain user."""
         user = User.objects.get(id=pk)
-        followers = user.followers.all()
-
-        serializer = UserSerializer(followers, many=True)
+        followers = user.followers.prefetch_related(
+            "followers", "followings"
+        ).order_by("-date_joined", "-id")
 
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return self.conditional_list(followers, UserSerializer)
 
     @action(
         methods=["GET"],
@@ -116,11 +274,11 @@ class UserViewSet(
     def published_posts(self, request, pk):
         """Endpoint to retrieve published posts of certain user."""
         user = User.objects.get(id=pk)
-        posts = user.posts.filter(published=True)
+        posts = user.posts.filter(published=True).prefetch_related(
+            "hashtags", "comments__author"
+        ).with_images().order_by("-created_at", "-id")
 
-        serializer = PostSerializer(posts, many=True)
-
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return self.conditional_list(posts, PostSerializer, POST_ETAG_FIELDS)
 
     @action(
         methods=["GET"],
@@ -131,9 +289,31 @@ class UserViewSet(
     def liked_posts(self, request, pk):
         """Endpoint to retrieve a post that was liked by current user."""
         user = self.request.user
-        liked_posts = user.post_like.all()
+        liked_posts = user.post_like.prefetch_related(
+            "hashtags", "comments__author"
+        ).with_images().order_by("-created_at", "-id")
 
-        serializer = PostSerializer(liked_posts, many=True)
+        return self.conditional_list(
+            liked_posts, PostSerializer, POST_ETAG_FIELDS
+        )
+
+    @action(
+        methods=["GET"],
+        detail=True,
+        url_path="suggestions",
+        permission_classes=[IsAuthenticated],
+    )
+    def suggestions(self, request, pk):
+        """Endpoint to retrieve "people you may know" for current user."""
+        if pk != str(request.user.id):
+            raise PermissionDenied(
+                "Suggestions are only shown to their owner."
+            )
+
+        suggestions = request.user.follow_suggestions.select_related(
+            "suggested"
+        )
+        serializer = FollowSuggestionSerializer(suggestions, many=True)
 
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -142,6 +322,7 @@ class UserViewSet(
         detail=True,
         url_path="upload-image",
         permission_classes=[IsAuthenticated],
+        parser_classes=[ImageUploadParser],
     )
     def upload_image(self, request, pk=None):
         """Endpoint for uploading profile picture to current user."""
@@ -149,7 +330,14 @@ class UserViewSet(
         serializer = self.get_serializer(user, data=request.data)
 
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        with transaction.atomic():
+            replaced = images.file_names(user)
+            serializer.save(image_variants={})
+            media.retain(images.file_names(user))
+            media.release(replaced)
+        transaction.on_commit(
+            lambda: render_image_variants.delay("user", user.id)
+        )
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     # For documentation purposes only
@@ -160,6 +348,13 @@ class UserViewSet(
                 type={"type": "list", "items": {"type": "string"}},
                 description="Filter by user's last name "
                             "(ex. ?last_name=Simmons)"
+            ),
+            OpenApiParameter(
+                name="q",
+                type=OpenApiTypes.STR,
+                description="Typo tolerant search over first name, last "
+                            "name and email, best matches first "
+                            "(ex. ?q=simmons)"
             )
         ]
     )
@@ -168,42 +363,239 @@ class UserViewSet(
 
 
 class HashtagViewSet(
+    ConditionalListMixin,
     generics.ListCreateAPIView,
     mixins.UpdateModelMixin,
     generics.RetrieveAPIView,
     viewsets.GenericViewSet
 ):
     serializer_class = HashtagSerializer
-    authentication_classes = (JWTAuthentication,)
+    authentication_classes = (CachedJWTAuthentication,)
     permission_classes = (IsAuthenticated,)
-    queryset = Hashtag.objects.all()
+    queryset = Hashtag.objects.order_by("-id")
+    list_etag_fields = ("id", "name", "post_count")
 
     def get_serializer_class(self):
-        if self.action == "list":
+        if self.action in ("list", "autocomplete"):
             return HashtagListSerializer
         if self.action == "retrieve":
             return HashtagDetailSerializer
+        if self.action == "posts":
+            return PostListSerializer
+        if self.action == "trending":
+            return TrendingHashtagSerializer
         return self.serializer_class
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="prefix",
+                type=OpenApiTypes.STR,
+                required=True,
+                description="Beginning of the hashtag name, with or "
+                            "without '#' (ex. ?prefix=inno)"
+            )
+        ]
+    )
+    @action(
+        methods=["GET"],
+        detail=False,
+        url_path="autocomplete",
+        authentication_classes=[StatelessJWTAuthentication],
+    )
+    def autocomplete(self, request):
+        """Endpoint to suggest the most used hashtags starting with prefix."""
+        prefix = normalize_hashtag(request.query_params.get("prefix", ""))
+        if not prefix:
+            raise ValidationError({"prefix": "This parameter is required."})
+
+        hashtags = cache.get_or_set(
+            f"hashtag-autocomplete:{prefix}",
+            lambda: self.get_serializer(
+                Hashtag.objects.filter(name__startswith=prefix).order_by(
+                    "-post_count", "name"
+                )[:settings.HASHTAG_AUTOCOMPLETE_SIZE],
+                many=True
+            ).data,
+            settings.HASHTAG_AUTOCOMPLETE_CACHE_TIMEOUT
+        )
+
+        response = Response(hashtags, status=status.HTTP_200_OK)
+        patch_cache_control(
+            response, max_age=settings.HASHTAG_AUTOCOMPLETE_CACHE_TIMEOUT
+        )
+        return response
+
+    @action(
+        methods=["GET"],
+        detail=False,
+        url_path="trending",
+        authentication_classes=[StatelessJWTAuthentication],
+    )
+    def trending(self, request):
+        """Endpoint to list the most used hashtags of the recent window."""
+        serializer = self.get_serializer(
+            trending.trending_hashtags(), many=True
+        )
+
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @action(
+        methods=["GET"],
+        detail=True,
+        url_path="posts",
+        authentication_classes=[StatelessJWTAuthentication],
+    )
+    def posts(self, request, pk=None):
+        """Endpoint to page through the posts tagged with certain hashtag."""
+        hashtag = self.get_object()
+        posts = hashtag.posts.filter(published=True).with_like_status(
+            request.user
+        ).select_related("author").prefetch_related(
+            "hashtags"
+        ).with_images().order_by("-created_at", "-id")
+
+        return self.conditional_list(
+            posts, etag_fields=POST_LIST_ETAG_FIELDS
+        )
+
 
-class PostViewSet(ModelViewSet):
+class PostViewSet(ConditionalListMixin, ModelViewSet):
     serializer_class = PostSerializer
-    authentication_classes = (JWTAuthentication,)
+    authentication_classes = (CachedJWTAuthentication,)
     permission_classes = (
         IsAuthenticated,
         IsAuthorOrIfAuthenticatedReadOnly,
     )
     queryset = Post.objects.all()
+    throttle_scope = None
+    list_etag_fields = POST_LIST_ETAG_FIELDS
+
+    def get_throttles(self):
+        if self.action == "create":
+            self.throttle_scope = "post_create"
+        return super().get_throttles()
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        with transaction.atomic():
+            post = serializer.save(author=self.request.user)
+            User.objects.filter(id=self.request.user.id).update(
+                post_count=F("post_count") + 1
+            )
+
+        if post.published:
+            transaction.on_commit(lambda: fan_out_post.delay(post.id))
+        else:
+            self._schedule_publishing(post)
+
+    def perform_update(self, serializer):
+        was_published = serializer.instance.published
+        previous_publish_time = serializer.instance.publish_time
+        post = serializer.save()
+        post_cache.invalidate(post.id)
+        if post.published:
+            # Timelines hold post ids only, so edits need no new fan-out.
+            if not was_published:
+                transaction.on_commit(lambda: fan_out_post.delay(post.id))
+        else:
+            if was_published:
+                timeline.remove_post(post)
+            if post.publish_time != previous_publish_time:
+                self._schedule_publishing(post)
+
+    @staticmethod
+    def _schedule_publishing(post):
+        """Enqueue publishing of a scheduled post at its publish time.
+
+        A task left over from an earlier publish time is harmless: it only
+        publishes once the current publish time has passed.
+        """
+        if post.publish_time is not None:
+            transaction.on_commit(
+                lambda: schedule_publishing(post.id, post.publish_time)
+            )
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            Hashtag.objects.filter(posts=instance).update(
+                post_count=F("post_count") - 1
+            )
+            released = images.file_names(instance)
+            for post_image in instance.images.all():
+                released += images.file_names(post_image)
+            instance.delete()
+            User.objects.filter(id=instance.author_id).update(
+                post_count=F("post_count") - 1
+            )
+            media.release(released)
+            post_cache.invalidate(instance.id)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Serve the post detail from its versioned cache entry.
+
+        The version is also the ETag, so clients holding the current one
+        get an empty 304 response.
+        """
+        try:
+            post_id = int(kwargs["pk"])
+        except ValueError:
+            raise NotFound
+
+        version = post_cache.get_version(post_id)
+        origin = request.build_absolute_uri("/")
+        detail = post_cache.get_detail(post_id, version, origin)
+        if detail is None:
+            post = self.get_object()
+            detail = post_cache.set_detail(
+                post, version, origin, self.get_serializer(post).data
+            )
+        elif not post_cache.is_visible(detail, request.user):
+            raise NotFound
+
+        headers = {"ETag": post_cache.get_etag(post_id, version)}
+        if headers["ETag"] in parse_etags(
+            request.headers.get("If-None-Match", "")
+        ):
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED, headers=headers
+            )
+
+        return Response(detail["data"], headers=headers)
 
     def get_queryset(self):
         user = self.request.user
-        user_followings = user.followings.all()
-        queryset = self.queryset.filter(
-            Q(author=user) | Q(author__in=user_followings)
-        ).filter(published=True)
+        ordering = ("-created_at", "-id")
+
+        if self.action in (
+            "update", "partial_update", "destroy", "add_images"
+        ):
+            # Authors also edit their scheduled posts, which no feed shows.
+            queryset = Post.objects.filter(author=user)
+        elif self.action == "list" and user.timeline_built_at:
+            queryset = timeline.timeline_posts(user)
+            ordering = timeline.TIMELINE_ORDERING
+        else:
+            if self.action == "list":
+                self._warm_up_timeline(user)
+            queryset = timeline.feed_posts(user)
+
+        search = self.request.query_params.get("search")
+        if search:
+            queryset = queryset.search(search).order_by(
+                "-rank", "-created_at", "-id"
+            )
+        else:
+            queryset = queryset.order_by(*ordering)
+
+        if self.action == "list":
+            queryset = queryset.with_like_status(user).select_related(
+                "author"
+            ).prefetch_related("hashtags").with_images()
+
+        if self.action == "retrieve":
+            queryset = queryset.select_related("author").prefetch_related(
+                "comments__author"
+            ).with_images()
 
         hashtag = self.request.query_params.get("hashtag")
         title = self.request.query_params.get("title")
@@ -222,13 +614,21 @@ class PostViewSet(ModelViewSet):
 
         return queryset
 
+    @staticmethod
+    def _warm_up_timeline(user):
+        """Schedule a single timeline rebuild for a user with a cold feed."""
+        if cache.add(f"timeline-rebuild:{user.id}", True, timeout=5 * 60):
+            transaction.on_commit(lambda: rebuild_timeline.delay(user.id))
+
     def get_serializer_class(self):
         if self.action == "list":
             return PostListSerializer
         if self.action == "retrieve":
             return PostDetailSerializer
         if self.action == "upload_image":
-            return PostImageSerializer
+            return PostImageUploadSerializer
+        if self.action == "add_images":
+            return PostImagesUploadSerializer
         return self.serializer_class
 
     @action(
@@ -236,18 +636,31 @@ class PostViewSet(ModelViewSet):
         detail=True,
         url_path="like-unlike",
         permission_classes=[IsAuthenticated],
+        throttle_scope="like",
     )
     def like(self, request, pk=None):
         """Endpoint for liking/unliking certain post."""
         post = self.get_object()
         serializer = PostSerializer(post)
+        like = Post.likes.through
+
+        with transaction.atomic():
+            unliked, _ = like.objects.filter(
+                post=post, user=request.user
+            ).delete()
+            if unliked:
+                delta = -1
+            else:
+                _, liked = like.objects.get_or_create(
+                    post=post, user=request.user
+                )
+                delta = int(liked)
+
+            Post.objects.filter(id=post.id).update(
+                like_count=F("like_count") + delta
+            )
+            post_cache.invalidate(post.id)
 
-        if post.likes.filter(id=request.user.id).exists():
-            post.likes.remove(request.user)
-        else:
-            post.likes.add(request.user)
-
-        post.save()
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(
@@ -255,6 +668,7 @@ class PostViewSet(ModelViewSet):
         detail=True,
         url_path="upload-image",
         permission_classes=[IsAuthenticated],
+        parser_classes=[ImageUploadParser],
     )
     def upload_image(self, request, pk=None):
         """Endpoint for uploading an image to certain post."""
@@ -262,12 +676,81 @@ class PostViewSet(ModelViewSet):
         serializer = self.get_serializer(post, data=request.data)
 
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        with transaction.atomic():
+            replaced = images.file_names(post)
+            serializer.save(image_variants={})
+            media.retain(images.file_names(post))
+            media.release(replaced)
+            post_cache.invalidate(post.id)
+        transaction.on_commit(
+            lambda: render_image_variants.delay("post", post.id)
+        )
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    @action(
+        methods=["POST"],
+        detail=True,
+        url_path="images",
+        permission_classes=[
+            IsAuthenticated,
+            IsAuthorOrIfAuthenticatedReadOnly,
+        ],
+        parser_classes=[ImageUploadParser],
+    )
+    def add_images(self, request, pk=None):
+        """Endpoint for adding several images to the gallery of a post.
+
+        The files are stored in one go and their variants are rendered in
+        parallel by the Celery worker pool.
+        """
+        post = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        files = serializer.validated_data["images"]
+
+        with transaction.atomic():
+            # Lock the post so that concurrent uploads get distinct positions.
+            post = Post.objects.select_for_update().get(id=post.id)
+            position = post.images.count()
+            if position + len(files) > settings.POST_IMAGES_MAX:
+                raise ValidationError(
+                    {
+                        "images": [
+                            f"A post holds at most "
+                            f"{settings.POST_IMAGES_MAX} images."
+                        ]
+                    }
+                )
+
+            post_images = PostImage.objects.bulk_create(
+                PostImage(post=post, image=image, position=position + index)
+                for index, image in enumerate(files)
+            )
+            media.retain(post_image.image.name for post_image in post_images)
+            post.save(update_fields=["updated_at"])
+            post_cache.invalidate(post.id)
+
+        transaction.on_commit(
+            lambda: group(
+                render_image_variants.s("postimage", post_image.id)
+                for post_image in post_images
+            ).delay()
+        )
+        serializer = PostImageSerializer(
+            post_images, many=True, context=self.get_serializer_context()
+        )
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
     # For documentation purposes only
     @extend_schema(
         parameters=[
+            OpenApiParameter(
+                name="search",
+                type=OpenApiTypes.STR,
+                description="Full-text search over title, hashtags and "
+                            "content, best matches first "
+                            "(ex. ?search=renewable energy)"
+            ),
             OpenApiParameter(
                 name="hashtag",
                 type=OpenApiTypes.STR,
@@ -293,14 +776,17 @@ class PostViewSet(ModelViewSet):
         return super().list(request, *args, **kwargs)
 
 
-class CommentViewSet(ModelViewSet):
+class CommentViewSet(ConditionalListMixin, ModelViewSet):
     serializer_class = CommentSerializer
-    authentication_classes = (JWTAuthentication,)
+    authentication_classes = (CachedJWTAuthentication,)
     permission_classes = (IsAuthorOrIfAuthenticatedReadOnly,)
     queryset = Comment.objects.all()
+    list_etag_fields = ("id", "content")
 
     def get_queryset(self):
-        queryset = Comment.objects.all()
+        queryset = Comment.objects.select_related("author").order_by(
+            "-created_at", "-id"
+        )
         if self.action in ["retrieve", "list"]:
             post_id = self.request.query_params.get("post_id")
             queryset = queryset.filter(post__id=post_id)
@@ -311,9 +797,31 @@ class CommentViewSet(ModelViewSet):
 
     def perform_create(self, serializer):
         post_id = self.request.query_params.get("post_id")
-        serializer.save(
-            author=self.request.user, post=Post.objects.get(id=post_id)
+
+        with transaction.atomic():
+            comment = serializer.save(
+                author=self.request.user, post=Post.objects.get(id=post_id)
+            )
+            Post.objects.filter(id=post_id).update(
+                comment_count=F("comment_count") + 1
+            )
+            post_cache.invalidate(comment.post_id)
+
+    def perform_update(self, serializer):
+        comment = serializer.save()
+        # Post serializers nest the comments.
+        Post.objects.filter(id=comment.post_id).update(
+            updated_at=timezone.now()
         )
+        post_cache.invalidate(comment.post_id)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            Post.objects.filter(id=instance.post_id).update(
+                comment_count=F("comment_count") - 1
+            )
+            post_cache.invalidate(instance.post_id)
 
     # For documentation purposes only
     @extend_schema(